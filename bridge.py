@@ -0,0 +1,552 @@
+from collections.abc import Sequence
+from contextlib import contextmanager
+import random
+import select
+import socket
+import socketserver
+import struct
+from .fusion_alias import Comp, Flow, Tool
+from .fusion_setting import screen_tool_names
+from .resolve_api import InputCache, ResolveAPI, ToolPool
+
+# Lets the GUI run outside of Resolve. A BridgeClient stands in for the
+# ResolveAPI and sends its calls over a local socket to a BridgeServer, which
+# runs inside Resolve and makes them on the real ResolveAPI.
+#
+# Every frame is a length prefix followed by a batch of commands, and is
+# answered by one reply frame. Integers are zigzag varints. Floats travel as
+# fixed point deltas from the same field of the previous screen in the frame,
+# so the repeated widths and heights of a grid take a byte each. Tools never
+# leave the server: the client names them with integer handles it allocates.
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50515)
+
+FLOAT_SCALE = 10**9
+FIELDS = ("Width", "Height", "CenterX", "CenterY", "Size")
+
+ADD_CANVAS = 1
+ADD_SCREENS = 2
+UPDATE_SCREEN = 3
+DELETE_SCREENS = 4
+DELETE_ALL_SCREENS = 5
+REFRESH_GLOBAL = 6
+PASTE_LAYOUT = 7
+SESSION = 8
+
+OK = 0
+ERROR = 1
+
+HEADER = struct.Struct("!I")
+
+
+class BridgeError(Exception):
+    """Raised on the client for a command that failed on the server."""
+
+
+class BridgeStateLost(BridgeError):
+    """Raised on the client when it reconnects to a different server process,
+    which does not know the tools of any screen added before."""
+
+
+# Encoding ====================================================================
+def flatten(values: dict[str, float | list[float]]) -> dict[str, float]:
+    flat = {key: value for key, value in values.items() if key != "Center"}
+    if "Center" in values:
+        flat["CenterX"], flat["CenterY"] = values["Center"]
+    return flat
+
+
+def unflatten(flat: dict[str, float]) -> dict[str, float | list[float]]:
+    values = {key: value for key, value in flat.items() if not key.startswith("Center")}
+    if "CenterX" in flat:
+        values["Center"] = [flat["CenterX"], flat["CenterY"]]
+    return values
+
+
+class Writer:
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._last = [0] * len(FIELDS)
+
+    def uint(self, n: int) -> None:
+        while n > 0x7F:
+            self.data.append(n & 0x7F | 0x80)
+            n >>= 7
+        self.data.append(n)
+
+    def sint(self, n: int) -> None:
+        self.uint(n << 1 if n >= 0 else (-n << 1) - 1)
+
+    def ints(self, items: Sequence[int]) -> None:
+        self.uint(len(items))
+        for n in items:
+            self.sint(n)
+
+    def text(self, text: str) -> None:
+        encoded = text.encode("utf-8")
+        self.uint(len(encoded))
+        self.data += encoded
+
+    def values(self, values: dict[str, float | list[float]]) -> None:
+        """Writes the fields present in values, preceded by their bitmask."""
+        flat = flatten(values)
+        mask = 0
+        for i, field in enumerate(FIELDS):
+            if field in flat:
+                mask |= 1 << i
+        self.uint(mask)
+
+        for i, field in enumerate(FIELDS):
+            if field not in flat:
+                continue
+            fixed = round(flat[field] * FLOAT_SCALE)
+            self.sint(fixed - self._last[i])
+            self._last[i] = fixed
+
+
+class Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+        self._last = [0] * len(FIELDS)
+
+    def uint(self) -> int:
+        n = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def sint(self) -> int:
+        n = self.uint()
+        return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+    def ints(self) -> list[int]:
+        return [self.sint() for _ in range(self.uint())]
+
+    def text(self) -> str:
+        length = self.uint()
+        text = bytes(self.data[self.pos : self.pos + length]).decode("utf-8")
+        self.pos += length
+        return text
+
+    def values(self) -> dict[str, float | list[float]]:
+        mask = self.uint()
+        flat = {}
+        for i, field in enumerate(FIELDS):
+            if not mask & 1 << i:
+                continue
+            self._last[i] += self.sint()
+            flat[field] = self._last[i] / FLOAT_SCALE
+        return unflatten(flat)
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= len(self.data)
+
+
+def send_frame(sock: socket.socket, data: bytes) -> None:
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def receive_frame(stream) -> bytes | None:
+    """Reads one frame from a file-like stream, or None once it is closed."""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    data = stream.read(length)
+    if len(data) < length:
+        return None
+    return data
+
+
+# Client ======================================================================
+class BridgeClient:
+    """A ResolveAPI whose calls are made by a BridgeServer, one round-trip each.
+    Calls made within batch() share a single round-trip. The connection is
+    opened on first use and kept open. If the server was restarted meanwhile,
+    the next call raises BridgeStateLost instead of being sent."""
+
+    def __init__(self, address: tuple[str, int] = DEFAULT_ADDRESS) -> None:
+        self.address = address
+        self._sock: socket.socket = None
+        self._stream = None
+
+        self._writer: Writer = None
+        self._batch_depth = 0
+        self._next_handle = 1
+        self.session: int = None
+
+    # ResolveAPI methods ======================================================
+    def refresh_global(
+        self,
+        resolution: tuple[int, int],
+        screen_tools: list[tuple[int, int]],
+        screen_values: Sequence[dict[str, float]] | None = None,
+    ) -> None:
+        writer = self._command(REFRESH_GLOBAL)
+        writer.ints(resolution)
+        writer.ints([handle for tools in screen_tools for handle in tools])
+        if screen_values is None:
+            writer.uint(0)
+        else:
+            writer.uint(len(screen_values) + 1)
+            for values in screen_values:
+                writer.values(values)
+        self._send()
+
+    def add_canvas(self, width: int, height: int) -> None:
+        self._command(ADD_CANVAS).ints((width, height))
+        self._send()
+
+    def add_screen(self, **values) -> tuple[int, int, int]:
+        return self.add_screens([values])[0]
+
+    def add_screens(
+        self, values_list: Sequence[dict[str, float]]
+    ) -> list[tuple[int, int, int]]:
+        writer = self._command(ADD_SCREENS)
+        tools_list = [self._new_handles() for _ in values_list]
+        writer.uint(len(values_list))
+        for tools, values in zip(tools_list, values_list):
+            writer.ints(tools)
+            writer.values(values)
+        self._send()
+        return tools_list
+
+    def paste_layout(self, setting: str) -> list[tuple[int, int, int]]:
+        """Needs its reply to know the number of screens, so it is never batched."""
+        writer = self._command(PASTE_LAYOUT)
+        first = self._next_handle
+        writer.sint(first)
+        writer.text(setting)
+        (count,) = self._flush()
+        self._next_handle += 3 * count
+        return [tuple(range(first + 3 * i, first + 3 * i + 3)) for i in range(count)]
+
+    def update_screen(self, tools: tuple[int, int, int], **values) -> None:
+        writer = self._command(UPDATE_SCREEN)
+        writer.ints(tools)
+        writer.values(values)
+        self._send()
+
+    def delete_screen(self, tools: tuple[int, int, int]) -> None:
+        self._command(DELETE_SCREENS).ints(tools)
+        self._send()
+
+    def delete_all_screens(self) -> None:
+        self._command(DELETE_ALL_SCREENS)
+        self._send()
+
+    # Transport ===============================================================
+    @contextmanager
+    def batch(self):
+        """Sends the calls made within in one frame, when the outermost exits.
+        If it exits with an error, the calls are dropped instead."""
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._batch_depth == 1:
+                self._writer = None
+            raise
+        finally:
+            self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._flush()
+
+    def close(self) -> None:
+        if self._sock is None:
+            return
+        self._stream.close()
+        self._sock.close()
+        self._sock = self._stream = None
+
+    def _new_handles(self) -> tuple[int, int, int]:
+        first = self._next_handle
+        self._next_handle += 3
+        return first, first + 1, first + 2
+
+    def _command(self, opcode: int) -> Writer:
+        if self._writer is None:
+            self._writer = Writer()
+        self._writer.uint(opcode)
+        return self._writer
+
+    def _send(self) -> None:
+        if self._batch_depth == 0:
+            self._flush()
+
+    def _flush(self) -> list[int]:
+        """Sends pending commands and returns the ints of the reply."""
+        if self._writer is None:
+            return []
+        data, self._writer = bytes(self._writer.data), None
+
+        reply = self._round_trip(data)
+        reader = Reader(reply)
+        if reader.uint() == ERROR:
+            raise BridgeError(reader.text())
+        return reader.ints()
+
+    def _round_trip(self, data: bytes) -> bytes:
+        # Sending on a connection the server has closed usually succeeds, so a
+        # closed connection is detected before sending. Reconnecting only helps
+        # if the same server is still running, see _connect. Once a frame is
+        # sent, a lost reply is not retried, as the server may have run it.
+        if self._sock is not None and self._connection_closed():
+            self.close()
+        if self._sock is None:
+            self._connect()
+
+        try:
+            send_frame(self._sock, data)
+        except OSError:
+            self.close()
+            raise
+
+        reply = receive_frame(self._stream)
+        if reply is None:
+            self.close()
+            raise ConnectionError("The bridge closed the connection.")
+        return reply
+
+    def _connection_closed(self) -> bool:
+        """Replies are always read in full, so an idle connection only becomes
+        readable when the server closes it."""
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and not self._sock.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _connect(self) -> None:
+        """Connects and checks that the server is the one the handles were given to."""
+        self._sock = socket.create_connection(self.address)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile("rb")
+
+        writer = Writer()
+        writer.uint(SESSION)
+        send_frame(self._sock, bytes(writer.data))
+        reply = receive_frame(self._stream)
+        if reply is None:
+            self.close()
+            raise ConnectionError("The bridge closed the connection.")
+        reader = Reader(reply)
+        reader.uint()
+        (session,) = reader.ints()
+
+        previous, self.session = self.session, session
+        if previous is not None and session != previous:
+            raise BridgeStateLost(
+                "The bridge was restarted and lost the tools of every screen. "
+                "Add them again, e.g. with paste_layout."
+            )
+
+
+# Server ======================================================================
+class BridgeServer(socketserver.TCPServer):
+    """Makes the calls of BridgeClients on a ResolveAPI, one frame at a time.
+    Clients are served one after the other, as Fusion is."""
+
+    allow_reuse_address = True
+
+    def __init__(
+        self, api: ResolveAPI, address: tuple[str, int] = DEFAULT_ADDRESS
+    ) -> None:
+        super().__init__(address, BridgeHandler)
+        self.api = api
+        self.tools: dict[int, Tool] = {}
+        # Tells clients apart from a restarted server, whose tools are gone.
+        self.session = random.getrandbits(31)
+
+    def execute(self, data: bytes) -> list[int]:
+        reader = Reader(data)
+        result = []
+        while not reader.done:
+            result = self.execute_command(reader.uint(), reader)
+        return result
+
+    def execute_command(self, opcode: int, reader: Reader) -> list[int]:
+        api, tools = self.api, self.tools
+
+        if opcode == ADD_CANVAS:
+            api.add_canvas(*reader.ints())
+        elif opcode == ADD_SCREENS:
+            handles_list, values_list = [], []
+            for _ in range(reader.uint()):
+                handles_list.append(reader.ints())
+                values_list.append(reader.values())
+            for handles, new_tools in zip(handles_list, api.add_screens(values_list)):
+                tools.update(zip(handles, new_tools))
+        elif opcode == UPDATE_SCREEN:
+            handles = reader.ints()
+            api.update_screen(tuple(tools[h] for h in handles), **reader.values())
+        elif opcode == DELETE_SCREENS:
+            api.delete_screen(tuple(tools.pop(h) for h in reader.ints()))
+        elif opcode == DELETE_ALL_SCREENS:
+            api.delete_all_screens()
+            tools.clear()
+        elif opcode == REFRESH_GLOBAL:
+            resolution = tuple(reader.ints())
+            handles = reader.ints()
+            screen_tools = [
+                (tools[handles[i]], tools[handles[i + 1]])
+                for i in range(0, len(handles), 2)
+            ]
+            count = reader.uint()
+            screen_values = None
+            if count:
+                screen_values = [reader.values() for _ in range(count - 1)]
+            api.refresh_global(resolution, screen_tools, screen_values)
+        elif opcode == PASTE_LAYOUT:
+            first = reader.sint()
+            tools_list = api.paste_layout(reader.text())
+            tools.clear()  # The paste replaced every screen.
+            for i, new_tools in enumerate(tools_list):
+                handles = range(first + 3 * i, first + 3 * i + 3)
+                tools.update(zip(handles, new_tools))
+            return [len(tools_list)]
+        elif opcode == SESSION:
+            return [self.session]
+        else:
+            raise ValueError(f"Unknown bridge command {opcode}.")
+        return []
+
+
+class BridgeHandler(socketserver.StreamRequestHandler):
+    """Serves the frames of one connection until the client closes it."""
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        server: BridgeServer = self.server
+        while (data := receive_frame(self.rfile)) is not None:
+            writer = Writer()
+            try:
+                result = server.execute(data)
+            except Exception as error:
+                writer.uint(ERROR)
+                writer.text(f"{type(error).__name__}: {error}")
+            else:
+                writer.uint(OK)
+                writer.ints(result)
+            send_frame(self.connection, bytes(writer.data))
+
+
+# Stand-in ====================================================================
+class StandInResolveAPI:
+    """A ResolveAPI built on fusion_alias, to run a BridgeServer without Resolve.
+    Screen tools go through a ToolPool; call close() before exiting."""
+
+    def __init__(self) -> None:
+        self.comp = Comp()
+        self.flow = Flow()
+        self.cache = InputCache()
+        self.pool = ToolPool(self.comp, self.flow, cache=self.cache)
+        self.canvas: Tool = None
+        self.screens: list[tuple[Tool, Tool, Tool]] = []
+        # Only ever grows, so live screens never share tool names.
+        self._next_index = 1
+
+    def refresh_global(
+        self,
+        resolution: tuple[int, int],
+        screen_tools: list[tuple[Tool, Tool]],
+        screen_values: Sequence[dict[str, float]] | None = None,
+    ) -> None:
+        if self.canvas is not None:
+            width, height = resolution
+            self.cache.set_inputs(self.canvas, Width=width, Height=height)
+        if screen_values is None:
+            return
+        for (mask, transform), values in zip(screen_tools, screen_values):
+            self.set_screen_inputs(mask, transform, values)
+
+    def add_canvas(self, width: int, height: int) -> None:
+        self.canvas = self.comp.AddTool("Background", 0, 0)
+        self.canvas.SetAttrs({"TOOLS_Name": "Canvas"})
+        self.cache.set_inputs(self.canvas, Width=width, Height=height)
+
+    def add_screen(self, **values) -> tuple[Tool, Tool, Tool]:
+        return self.add_screens([values])[0]
+
+    def add_screens(
+        self, values_list: Sequence[dict[str, float]]
+    ) -> list[tuple[Tool, Tool, Tool]]:
+        tools_list = []
+        for values in values_list:
+            index = self._next_index
+            self._next_index += 1
+            tools = tuple(
+                self.pool.acquire(tool_id, 0, index)
+                for tool_id in ("RectangleMask", "Transform", "Merge")
+            )
+            for tool, name in zip(tools, screen_tool_names(index)):
+                tool.SetAttrs({"TOOLS_Name": name})
+            self.set_screen_inputs(tools[0], tools[1], values)
+            self.screens.append(tools)
+            tools_list.append(tools)
+        self.flow.FlushSetPosQueue()
+        return tools_list
+
+    def paste_layout(self, setting: str) -> list[tuple[Tool, Tool, Tool]]:
+        # The layout brings its own canvas and screens, named as these are.
+        self.delete_all_screens()
+        self.pool.flush()
+        if self.canvas is not None:
+            self.cache.forget(self.canvas)
+            self.canvas.Delete()
+
+        self.comp.Paste(setting)
+        self.canvas = self.comp.FindTool("Canvas")
+        count = setting.count(" = Merge {")
+        self.screens = [
+            tuple(self.comp.FindTool(name) for name in screen_tool_names(i))
+            for i in range(1, count + 1)
+        ]
+        self._next_index = count + 1
+        return list(self.screens)
+
+    def update_screen(self, tools: tuple[Tool, Tool, Tool], **values) -> None:
+        self.set_screen_inputs(tools[0], tools[1], values)
+
+    def delete_screen(self, tools: tuple[Tool, Tool, Tool]) -> None:
+        self.pool.release(*tools)
+        self.screens.remove(tools)
+
+    def delete_all_screens(self) -> None:
+        self.pool.release(*[tool for tools in self.screens for tool in tools])
+        self.screens.clear()
+
+    def close(self) -> None:
+        self.pool.flush()
+
+    def set_screen_inputs(
+        self, mask: Tool, transform: Tool, values: dict[str, float]
+    ) -> None:
+        mask_inputs = {
+            key: values[key] for key in ("Width", "Height", "Center") if key in values
+        }
+        transform_inputs = {
+            key: values[key] for key in ("Center", "Size") if key in values
+        }
+        self.cache.set_inputs(mask, **mask_inputs)
+        self.cache.set_inputs(transform, **transform_inputs)
+
+
+if __name__ == "__main__":
+    api = StandInResolveAPI()
+    with BridgeServer(api) as server:
+        print(f"Serving a stand-in ResolveAPI on {server.server_address}.")
+        try:
+            server.serve_forever()
+        finally:
+            api.close()
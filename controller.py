@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from .core import Grid, Screen
+import heapq
+from typing import Iterator
+from .core import Grid, Screen, ScreenValues
 from .fusion_alias import Tool
 from .resolve_api import ResolveAPI
 from .gui import GUI
-from .utils import find_first_missing
+from .fusion_setting import layout_setting, write_setting
 
 
 @dataclass
@@ -14,6 +16,70 @@ class ScreenDict:
     rectangle: int
 
 
+class ScreenRegistry:
+    """Indexes ScreenDicts by id, by GUI rectangle id and by Screen.
+    Iterates in creation order, which is also the order of the grid's ScreenStore."""
+
+    def __init__(self) -> None:
+        self._by_id: dict[int, ScreenDict] = {}
+        self._by_rectangle: dict[int, ScreenDict] = {}
+        self._by_screen: dict[Screen, ScreenDict] = {}
+
+        self._free_ids: list[int] = []
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[ScreenDict]:
+        return iter(self._by_id.values())
+
+    def new_id(self) -> int:
+        """Returns the lowest id not in use."""
+        if self._free_ids:
+            return heapq.heappop(self._free_ids)
+        id = self._next_id
+        self._next_id += 1
+        return id
+
+    def add(self, screen_dict: ScreenDict) -> None:
+        self._by_id[screen_dict.id] = screen_dict
+        self._by_rectangle[screen_dict.rectangle] = screen_dict
+        self._by_screen[screen_dict.screen] = screen_dict
+
+    def remove(self, screen_dict: ScreenDict) -> None:
+        del self._by_id[screen_dict.id]
+        self._by_rectangle.pop(screen_dict.rectangle, None)
+        self._by_screen.pop(screen_dict.screen, None)
+        heapq.heappush(self._free_ids, screen_dict.id)
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._by_rectangle.clear()
+        self._by_screen.clear()
+        self._free_ids.clear()
+        self._next_id = 0
+
+    def by_id(self, id: int) -> ScreenDict:
+        return self._by_id[id]
+
+    def by_rectangle(self, rect_id: int) -> ScreenDict:
+        return self._by_rectangle[rect_id]
+
+    def by_screen(self, screen: Screen) -> ScreenDict:
+        return self._by_screen[screen]
+
+    def rekey_rectangles(self, rect_ids: list[int]) -> None:
+        """Assigns new rectangle ids, given in creation order."""
+        if len(rect_ids) != len(self):
+            raise ValueError("Expected one rectangle id per screen.")
+
+        self._by_rectangle = {}
+        for screen_dict, rect_id in zip(self, rect_ids):
+            screen_dict.rectangle = rect_id
+            self._by_rectangle[rect_id] = screen_dict
+
+
 class Controller:
     """Responsible for receiving inputs and executing commands"""
 
@@ -22,7 +88,8 @@ class Controller:
         self.resolve_api = resolve_api
         self.gui = gui
 
-        self.screens: list[ScreenDict] = []
+        self.screens = ScreenRegistry()
+        self.pending_settings: dict[str, int] = {}
 
         self.commands: dict[str, dict[str, function]] = {
             "width": {
@@ -66,13 +133,19 @@ class Controller:
                 "setter": self.grid.set_rows,
             },
             "add_screen": self.add_screen,
+            "add_screens": self.add_screens,
             "delete_screen": self.delete_screen,
+            "edit_screen": self.edit_screen,
             "flip_h": self.flip_h,
             "flip_v": self.flip_v,
             "delete_all_screens": self.delete_all_screens,
+            "paste_layout": self.paste_layout,
+            "export_layout": self.export_layout,
         }
 
     def do_command(self, key: str, value: int | None = None) -> None:
+        self.drop_failed_screens()
+        self.flush_settings()
         command = self.commands[key]
         if value:
             command(value)
@@ -80,13 +153,38 @@ class Controller:
         command()
 
     def change_setting(self, key: str, value: int) -> None:
-        getter = self.commands[key]["getter"]
-        setter = self.commands[key]["setter"]
+        self.change_settings({key: value})
+
+    def queue_setting(self, key: str, value: int) -> None:
+        """Queues a setting change until the next flush_settings.
+        A key queued again keeps only its latest value, moved to the end."""
+        self.pending_settings.pop(key, None)
+        self.pending_settings[key] = value
 
-        if getter() == value:
+    def flush_settings(self) -> None:
+        """Applies all queued setting changes as one batch."""
+        if not self.pending_settings:
             return
+        settings, self.pending_settings = self.pending_settings, {}
+        self.change_settings(settings)
 
-        setter(value)
+    def change_settings(self, settings: dict[str, int]) -> None:
+        """Applies several settings at once, refreshing Resolve and the UI only once."""
+        changed = False
+
+        with self.grid.batch():
+            for key, value in settings.items():
+                getter = self.commands[key]["getter"]
+                setter = self.commands[key]["setter"]
+
+                if getter() == value:
+                    continue
+
+                setter(value)
+                changed = True
+
+        if not changed:
+            return
 
         self.refresh_resolve_api()
         self.refresh_ui()
@@ -97,6 +195,7 @@ class Controller:
         self.update_screen_rect_ids(rects)
 
     def refresh_resolve_api(self):
+        self.drop_failed_screens()
 
         self.resolve_api.refresh_global(
             self.canvas_resolution, self.screen_tools, self.screen_values
@@ -104,26 +203,101 @@ class Controller:
 
     # Screen Manipulation  ====================================================
     def add_screen(self, coords: tuple[int, int]):
-        if self.screens:
-            id = find_first_missing([screen.id for screen in self.screens])
-        else:
-            id = 0
+        span = Screen.span_from_coords(self.grid, *coords)
+        if self.grid.occupancy.overlaps(*span):
+            return
 
-        screen = Screen.create_from_coords(self.grid, *coords)
-        tools: tuple[Tool, Tool, Tool] = self.resolve_api.add_screen(**screen.values)
+        id = self.screens.new_id()
+
+        screen = Screen(self.grid, *span)
+        try:
+            tools: tuple[Tool, Tool, Tool] = self.resolve_api.add_screen(
+                **screen.values
+            )
+        except Exception:
+            # Keeps the grid's ScreenStore in step with self.screens.
+            screen.delete()
+            raise
         rectangle = self.gui.draw_screen(screen.values)
 
         screen_dict = ScreenDict(id, screen, tools, rectangle)
 
-        self.screens.append(screen_dict)
+        self.screens.add(screen_dict)
+
+    def add_screens(self, spans: list[tuple[int, int, int, int]]) -> None:
+        """Adds several screens, given as (colspan, rowspan, col, row), at once.
+        Spans outside the grid, or overlapping an existing screen or an earlier
+        span, are skipped."""
+        grid = self.grid
+        screens: list[Screen] = []
+        for span in spans:
+            if not grid.fits(*span) or grid.occupancy.overlaps(*span):
+                continue
+            screens.append(Screen(grid, *span))
+
+        if not screens:
+            return
+
+        values_list = [screen.values for screen in screens]
+        try:
+            tools_list = self.resolve_api.add_screens(values_list)
+        except Exception:
+            for screen in screens:
+                screen.delete()
+            raise
+
+        for screen, values, tools in zip(screens, values_list, tools_list):
+            rectangle = self.gui.draw_screen(values)
+            self.screens.add(
+                ScreenDict(self.screens.new_id(), screen, tools, rectangle)
+            )
+
+    def edit_screen(self, edit: tuple[int, int, int, int, int]) -> None:
+        """Moves or resizes a screen, given (rect_id, colspan, rowspan, col, row).
+        Only that screen's GUI item and changed tool inputs are updated."""
+        rect_id, *span = edit
+        screen_dict = self.find_screen_by_rect_id(rect_id)
+        screen = screen_dict.screen
+
+        if (screen.colspan, screen.rowspan, screen.col, screen.row) == tuple(span):
+            return
+        if not self.grid.fits(*span):
+            return
+        if self.grid.occupancy.overlaps(*span, ignore=screen):
+            return
+
+        old_values = screen.values
+        screen.edit(*span)
+        values = screen.values
+
+        changed = {
+            key: value for key, value in values.items() if old_values[key] != value
+        }
+        self.resolve_api.update_screen(screen_dict.tools, **changed)
+        self.gui.redraw_screen(rect_id, values)
+
+    def drop_failed_screens(self) -> None:
+        """Removes screens whose tools a queued ResolveAPI failed to add."""
+        take_failed = getattr(self.resolve_api, "take_failed", None)
+        if take_failed is None:
+            return
+
+        failed = {id(tools) for tools in take_failed()}
+        if not failed:
+            return
+
+        for screen_dict in [s for s in self.screens if id(s.tools) in failed]:
+            screen_dict.screen.delete()
+            self.gui.undraw_screens(screen_dict.rectangle)
+            self.screens.remove(screen_dict)
 
     def find_screen_by_rect_id(self, rect_id) -> ScreenDict:
-        return [screen for screen in self.screens if screen.rectangle == rect_id][0]
+        return self.screens.by_rectangle(rect_id)
 
     def delete_screen(self, rect_id: int):
         screen = self.find_screen_by_rect_id(rect_id)
 
-        self.grid.screens.remove(screen.screen)
+        screen.screen.delete()
         self.resolve_api.delete_screen(screen.tools)
         self.gui.undraw_screens(screen.rectangle)
 
@@ -133,20 +307,25 @@ class Controller:
         if not self.screens:
             return
 
-        rects = []
-        for screen_dict in self.screens:
-            screen = screen_dict.screen
-            self.grid.screens.remove(screen)
-
-            rect = screen_dict.rectangle
-            rects.append(rect)
+        self.grid.store.clear()
 
+        rects = [screen_dict.rectangle for screen_dict in self.screens]
         self.gui.undraw_screens(*rects)
 
         self.resolve_api.delete_all_screens()
 
         self.screens.clear()
 
+    # Whole Layouts  ==========================================================
+    def paste_layout(self) -> None:
+        """Rebuilds every tool in Resolve from one .setting paste."""
+        tools_list = self.resolve_api.paste_layout(layout_setting(self.grid))
+        for screen_dict, tools in zip(self.screens, tools_list):
+            screen_dict.tools = tools
+
+    def export_layout(self, path: str) -> None:
+        write_setting(self.grid, path)
+
     # Transformations  ===================================================
     def flip_h(self):
         self.grid.flip_horizontally()
@@ -166,13 +345,17 @@ class Controller:
         if rect_ids is None:  # Means there are still no screens.
             return
 
-        for screen_dict, id in zip(self.screens, rect_ids, strict=True):
-            screen_dict.rectangle = id
+        if rect_ids == [screen_dict.rectangle for screen_dict in self.screens]:
+            return
+
+        self.screens.rekey_rectangles(rect_ids)
 
     # Useful Properties  ======================================================
     @property
-    def screen_values(self) -> list[dict[str, float]]:
-        return [screen_dict.screen.values for screen_dict in self.screens]
+    def screen_values(self) -> ScreenValues:
+        """Values of every screen, read straight from the grid's ScreenStore.
+        Store rows and self.screens are both kept in creation order."""
+        return self.grid.store.values
 
     @property
     def canvas_resolution(self) -> tuple[int, int]:
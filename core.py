@@ -1,14 +1,58 @@
-from typing import Callable
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Callable, Iterator
+import weakref
 from .utils import get_coords
 
 
+class Children:
+    """Per-instance registry of observer callbacks.
+    Bound methods are held through weak references, so observers that are not
+    referenced anywhere else unsubscribe themselves when they are collected.
+    Other callables are held strongly until disowned."""
+
+    def __init__(self) -> None:
+        self._refs: dict[tuple[int, Callable], Callable[[], Callable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    @staticmethod
+    def _key(function: Callable) -> tuple[int, Callable]:
+        owner = getattr(function, "__self__", None)
+        if owner is None:
+            return id(function), None
+        return id(owner), function.__func__
+
+    def add(self, function: Callable) -> None:
+        key = self._key(function)
+        if key in self._refs:
+            return
+
+        if key[1] is None:
+            self._refs[key] = lambda: function
+            return
+
+        refs = self._refs
+        self._refs[key] = weakref.WeakMethod(function, lambda _: refs.pop(key, None))
+
+    def remove(self, function: Callable) -> None:
+        self._refs.pop(self._key(function), None)
+
+    def notify(self) -> None:
+        for ref in list(self._refs.values()):
+            function = ref()
+            if function is not None:
+                function()
+
+
 class Canvas:
     """Canvas object. Sizes defined and returned in pixels."""
 
-    _children: list[Callable] = []
-
     def __init__(self, resolution: tuple[int, int] = (1920, 1080)):
         self._width_px, self._height_px = resolution
+        self._children = Children()
 
     def __str__(self) -> str:
         title = "CANVAS\n"
@@ -16,7 +60,10 @@ class Canvas:
         return title + message
 
     def give_birth(self, function: Callable) -> None:
-        self._children.append(function)
+        self._children.add(function)
+
+    def disown(self, function: Callable) -> None:
+        self._children.remove(function)
 
     @property
     def width(self) -> int:
@@ -41,8 +88,11 @@ class Canvas:
     @resolution.setter
     def resolution(self, values: tuple[int, int]):
         self._width_px, self._height_px = values
-        for child in self._children:
-            child()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Tells children their normalized values are outdated."""
+        self._children.notify()
 
     @property
     def aspect_ratio(self) -> float:
@@ -67,8 +117,6 @@ class Canvas:
 class Margin:
     """Margin object. Values defined in pixels but returned normalized."""
 
-    _children: list[Callable] = []
-
     def __init__(
         self,
         canvas: Canvas,
@@ -78,6 +126,7 @@ class Margin:
     ) -> None:
 
         self.canvas = canvas
+        self._children = Children()
 
         if all:
             tlbr = (all, all, all, all)
@@ -95,8 +144,8 @@ class Margin:
         self._gutter_px = gutter
         self._gutter_h = self._gutter_w = 0.0
 
-        self.compute()
-        self.canvas.give_birth(self.compute)
+        self._dirty = True
+        self.canvas.give_birth(self.invalidate)
 
     def __str__(self) -> str:
         title = "MARGIN\n"
@@ -104,11 +153,26 @@ class Margin:
         return title + message
 
     def give_birth(self, function: Callable) -> None:
-        self._children.append(function)
+        self._children.add(function)
+
+    def disown(self, function: Callable) -> None:
+        self._children.remove(function)
 
     # THE COMPUTER ========================================
+    def invalidate(self) -> None:
+        """Marks normalized values as outdated, along with those of children."""
+        if self._dirty:
+            return
+        self._dirty = True
+        self._children.notify()
+
+    def update(self) -> None:
+        """Recomputes normalized values if they are outdated."""
+        if self._dirty:
+            self.compute()
+
     def compute(self) -> None:
-        """Computes normalized values and calls children."""
+        """Computes normalized values."""
 
         cwidth, cheight = self.canvas.width, self.canvas.height
 
@@ -122,49 +186,52 @@ class Margin:
         self._gutter_w = gutter / cwidth
         self._gutter_h = gutter / cheight
 
-        for child in self._children:
-            child()
+        self._dirty = False
 
     # PROPERTIES  AND SETTERS ========================================
     @property
     def top(self) -> float:
         """Returns a normalized value. For pixel value, use _px"""
+        self.update()
         return self._top
 
     @top.setter
     def top(self, value: int) -> None:
         self._top_px = value
-        self.compute()
+        self.invalidate()
 
     @property
     def left(self) -> float:
         """Returns a normalized value. For pixel value, use _px"""
+        self.update()
         return self._left
 
     @left.setter
     def left(self, value: int) -> None:
         self._left_px = value
-        self.compute()
+        self.invalidate()
 
     @property
     def bottom(self) -> float:
         """Returns a normalized value. For pixel value, use _px"""
+        self.update()
         return self._bottom
 
     @bottom.setter
     def bottom(self, value: int) -> None:
         self._bottom_px = value
-        self.compute()
+        self.invalidate()
 
     @property
     def right(self) -> float:
         """Returns a normalized value. For pixel value, use _px"""
+        self.update()
         return self._right
 
     @right.setter
     def right(self, value: int) -> None:
         self._right_px = value
-        self.compute()
+        self.invalidate()
 
     @property
     def all(self) -> dict[str, float]:
@@ -180,7 +247,7 @@ class Margin:
     def all(self, value: int) -> None:
         """Sets all margins to the same pixel value"""
         self._top_px = self._left_px = self._bottom_px = self._right_px = value
-        self.compute()
+        self.invalidate()
 
     @property
     def tlbr(self) -> dict[str, float]:
@@ -190,17 +257,18 @@ class Margin:
     def tlbr(self, values: tuple[int, int, int, int]) -> None:
         """Set all margins at the same time, with different values (top, left, bottom, right)"""
         self._top_px, self._left_px, self._bottom_px, self._right_px = values
-        self.compute()
+        self.invalidate()
 
     @property
     def gutter(self) -> tuple[float, float]:
         """Returns Gutter values (w,h), normalized."""
+        self.update()
         return self._gutter_w, self._gutter_h
 
     @gutter.setter
     def gutter(self, value: int):
         self._gutter_px = value
-        self.compute()
+        self.invalidate()
 
     # Setters and Getters for Controller use
     def set_top(self, value: int) -> None:
@@ -257,14 +325,17 @@ class Grid:
         self.margin = margin
         self._cols, self._rows = layout
 
-        self._children: list[Callable] = None
-        self._matrix: list[list[int]] = None
+        self._children = Children()
+        self._matrix = GridMatrix(self)
 
-        self._screens: list[Screen] = None
-        self._cells: list[GridCell] = None
+        self.geometry = GridGeometry(self)
+        self.occupancy = Occupancy()
+        self.store = ScreenStore(self)
 
-        self.compute()
-        self.margin.give_birth(self.compute)
+        self._col_width = self._row_height = 0.0
+        self._dirty = True
+        self._batch_depth = 0
+        self.margin.give_birth(self.invalidate)
 
     def __str__(self) -> str:
         title = "GRID\n"
@@ -272,45 +343,51 @@ class Grid:
         return title + message
 
     # COMPUTER METHOD ========================================
+    def invalidate(self) -> None:
+        """Marks normalized values as outdated, along with those of children."""
+        if self._dirty:
+            return
+        self._dirty = True
+        self._children.notify()
+
+    def update(self) -> None:
+        """Recomputes normalized values if they are outdated."""
+        if self._dirty:
+            self.compute()
+
     def compute(self) -> None:
-        """Computes normalized values and calls children."""
+        """Computes normalized values."""
 
         mg = self.margin
-        self.col_width = (
+        self._col_width = (
             1 - mg.left - mg.right - (self.cols - 1) * self.gutter[0]
         ) / self.cols
-        self.row_height = (
+        self._row_height = (
             1 - mg.top - mg.bottom - (self.rows - 1) * self.gutter[1]
         ) / self.rows
 
-        if self._matrix is None:
-            self._matrix = []
-        self._matrix.clear()
-        for row in range(self.rows):
-            x = row * self.cols + 1
-            matrix_row = [col + x for col in range(self.cols)]
-            self._matrix.append(matrix_row)
-
-        if self._children is None:
-            return
-        for child in self._children:
-            child()
+        self._dirty = False
+        self.geometry.compute()
+
+    @contextmanager
+    def batch(self) -> Iterator["Grid"]:
+        """Groups changes to canvas, margin and grid. Setters inside the block only
+        mark values as outdated; everything is computed once when it exits."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.update()
+                self.store.update()
 
     # OBSERVER METHODS ========================================
     def give_birth(self, function: Callable) -> None:
-        if self._children is None:
-            self._children = []
-        self._children.append(function)
-
-    def append_screen(self, screen) -> None:
-        if self._screens is None:
-            self._screens = []
-        self._screens.append(screen)
+        self._children.add(function)
 
-    def append_cell(self, cell) -> None:
-        if self._cells is None:
-            self._cells = []
-        self._cells.append(cell)
+    def disown(self, function: Callable) -> None:
+        self._children.remove(function)
 
     # TRANSFORM METHODS ========================================
     def _rotate_grid(self) -> None:
@@ -332,15 +409,21 @@ class Grid:
 
         ...
 
+    def fits(self, colspan: int, rowspan: int, col: int, row: int) -> bool:
+        """Tells if a span lies within the columns and rows of the grid."""
+        if colspan < 1 or rowspan < 1 or col < 1 or row < 1:
+            return False
+        return col + colspan - 1 <= self.cols and row + rowspan - 1 <= self.rows
+
     def flip_horizontally(self) -> bool:
-        if self.screens is None:
+        if not self.screens:
             return False
         for screen in self.screens:
             screen.flip_horizontally()
         return True
 
     def flip_vertically(self) -> bool:
-        if self.screens is None:
+        if not self.screens:
             return False
         for screen in self.screens:
             screen.flip_vertically()
@@ -355,7 +438,7 @@ class Grid:
     @cols.setter
     def cols(self, value: int):
         self._cols = value
-        self.compute()
+        self.invalidate()
 
     @property
     def rows(self) -> int:
@@ -365,7 +448,19 @@ class Grid:
     @rows.setter
     def rows(self, value: int):
         self._rows = value
-        self.compute()
+        self.invalidate()
+
+    @property
+    def col_width(self) -> float:
+        """Width of a single column, normalized."""
+        self.update()
+        return self._col_width
+
+    @property
+    def row_height(self) -> float:
+        """Height of a single row, normalized."""
+        self.update()
+        return self._row_height
 
     @property
     def gutter(self) -> tuple[float, float]:
@@ -384,20 +479,20 @@ class Grid:
     @composition.setter
     def composition(self, value: tuple[int, int]) -> None:
         self._cols, self._rows = value
-        self.compute()
+        self.invalidate()
 
     @property
-    def matrix(self) -> list:
+    def matrix(self) -> "GridMatrix":
         return self._matrix
 
     # LISTS ==============================
     @property
     def screens(self) -> list:
-        return self._screens
+        return self.store.screens
 
     @property
     def cells(self) -> list:
-        return self._cells
+        return self.geometry.cells
 
     # Setters and Getters for Controller use
     def set_cols(self, value: int) -> None:
@@ -416,34 +511,42 @@ class Grid:
 
 
 class Screen:
-    """Screen object class. Its dimensions and position are defined in columns and rows and returned in normalized values."""
+    """Screen object class. Its dimensions and position are defined in columns and rows and returned in normalized values.
+    Screens are handles over one row of their grid's ScreenStore."""
+
+    __slots__ = ("grid", "store", "_slot", "_name")
 
     def __init__(
         self, grid: Grid, colspan: int, rowspan: int, col: int, row: int
     ) -> None:
+        self._slot = None
         self.grid = grid
-
-        self._colspan = colspan
-        self._rowspan = rowspan
-
-        self._col = col
-        self._row = row
-
-        self.compute()
-        self.grid.give_birth(self.compute)
-        self.grid.append_screen(self)
+        self.store = grid.store
+        self.store.append(self, colspan, rowspan, col, row)
 
     def __str__(self) -> str:
         message = f"Colspan: {self.colspan}\tRowspan: {self.rowspan}\nCol: {self.col}\tRow: {self.row}\n"
         return message
 
     def delete(self) -> None:
-        if self not in self.grid.screens:
-            return
-        self.grid.screens.remove(self)
+        self.store.remove(self)
+
+    @property
+    def slot(self) -> int:
+        """Row of this screen in its grid's ScreenStore."""
+        if self._slot is None:
+            raise ScreenDeleted("This screen was deleted from its grid.")
+        return self._slot
 
     @classmethod
     def create_from_coords(cls, grid: Grid, point1: int, point2: int):
+        return Screen(grid, *cls.span_from_coords(grid, point1, point2))
+
+    @staticmethod
+    def span_from_coords(
+        grid: Grid, point1: int, point2: int
+    ) -> tuple[int, int, int, int]:
+        """Returns (colspan, rowspan, col, row) of the area between two cell indexes."""
         matrix = grid.matrix
 
         p1 = get_coords(point1, matrix)
@@ -454,7 +557,7 @@ class Screen:
         col = min(p1[0], p2[0])
         row = min(p1[1], p2[1])
 
-        return Screen(grid, colspan, rowspan, col, row)
+        return colspan, rowspan, col, row
 
     # TRANSFORMATION METHODS ==========================
     # SHOULD FLIP ONLY SELF. ADD GRID METHOD FOR FLIPPING ALL
@@ -480,39 +583,39 @@ class Screen:
     # Properties and setters ==========================
     @property
     def colspan(self) -> int:
-        return self._colspan
+        return self.store.colspans[self.slot]
 
     @colspan.setter
     def colspan(self, value: int) -> None:
-        self._colspan = value
-        self.compute()
+        self.store.colspans[self.slot] = value
+        self.invalidate()
 
     @property
     def rowspan(self) -> int:
-        return self._rowspan
+        return self.store.rowspans[self.slot]
 
     @rowspan.setter
     def rowspan(self, value: int) -> None:
-        self._rowspan = value
-        self.compute()
+        self.store.rowspans[self.slot] = value
+        self.invalidate()
 
     @property
     def col(self) -> int:
-        return self._col
+        return self.store.cols[self.slot]
 
     @col.setter
     def col(self, value: int) -> None:
-        self._col = value
-        self.compute()
+        self.store.cols[self.slot] = value
+        self.invalidate()
 
     @property
     def row(self) -> int:
-        return self._row
+        return self.store.rows[self.slot]
 
     @row.setter
     def row(self, value: int) -> None:
-        self._row = value
-        self.compute()
+        self.store.rows[self.slot] = value
+        self.invalidate()
 
     @property
     def name(self) -> str:
@@ -530,114 +633,682 @@ class Screen:
     def edit(self, colspan: int, rowspan: int, col: int, row: int) -> None:
         """For editing multiple attributes at the same time. Computes only once."""
 
-        self._colspan = colspan
-        self._rowspan = rowspan
-        self._col = col
-        self._row = row
-        self.compute()
+        store, slot = self.store, self.slot
+        store.colspans[slot] = colspan
+        store.rowspans[slot] = rowspan
+        store.cols[slot] = col
+        store.rows[slot] = row
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Marks normalized values as outdated."""
+        self.store.invalidate_row(self.slot)
+
+    def update(self) -> None:
+        """Recomputes normalized values if they are outdated."""
+        self.store.update()
 
     def compute(self) -> None:
         """Normalizes pixel values."""
+        self.store.compute_row(self.slot)
 
-        grid = self.grid
-        margin = grid.margin
+    @property
+    def width(self) -> float:
+        self.store.update()
+        return self.store.widths[self.slot]
+
+    @property
+    def height(self) -> float:
+        self.store.update()
+        return self.store.heights[self.slot]
+
+    @property
+    def x(self) -> float:
+        self.store.update()
+        return self.store.xs[self.slot]
+
+    @property
+    def y(self) -> float:
+        self.store.update()
+        return self.store.ys[self.slot]
+
+    @property
+    def size(self) -> float:
+        self.store.update()
+        return self.store.sizes[self.slot]
+
+    @property
+    def values(self) -> dict[str, float | list[float]]:
+        self.store.update()
+        return self.store.row_values(self.slot)
+
+    def get_values(self) -> dict[str, int]:
+        return self.values
+
+
+class ScreenStore:
+    """Keeps spans, positions and computed geometry of all screens of a grid in
+    contiguous arrays, one row per screen, in creation order.
+
+    Screen geometry is linear in the grid parameters (col width, gutter, margin),
+    so each row is compiled into coefficients once and global changes only need
+    one product of the coefficient matrix with the current parameters."""
+
+    # Coefficients per row: width, x, height and y, each as (size, gutter) factors.
+    STRIDE = 8
 
-        width = grid.col_width * self._colspan + (self._colspan - 1) * grid.gutter[0]
-        height = grid.row_height * self._rowspan + (self._rowspan - 1) * grid.gutter[1]
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+        self.screens: list[Screen] = []
+
+        self.colspans = array("l")
+        self.rowspans = array("l")
+        self.cols = array("l")
+        self.rows = array("l")
+
+        self.widths = array("d")
+        self.heights = array("d")
+        self.xs = array("d")
+        self.ys = array("d")
+        self.sizes = array("d")
+
+        self.coefficients = array("d")
+
+        self._dirty = False
+        self._stale: set[int] = set()
+
+        self.grid.give_birth(self.invalidate)
 
-        size = max(width, height)
+    def __len__(self) -> int:
+        return len(self.screens)
 
-        x = (
-            width / 2
-            + margin.left
-            + (self._col - 1) * (grid.col_width + grid.gutter[0])
+    @property
+    def _arrays(self) -> tuple[array, ...]:
+        return (
+            self.colspans,
+            self.rowspans,
+            self.cols,
+            self.rows,
+            self.widths,
+            self.heights,
+            self.xs,
+            self.ys,
+            self.sizes,
         )
-        y = (
-            height / 2
-            + margin.bottom
-            + (self._row - 1) * (grid.row_height + grid.gutter[1])
+
+    # ROWS ========================================
+    def append(
+        self, screen: Screen, colspan: int, rowspan: int, col: int, row: int
+    ) -> None:
+        screen._slot = len(self.screens)
+        self.screens.append(screen)
+
+        for column, value in zip(self._arrays, (colspan, rowspan, col, row)):
+            column.append(value)
+        for column in self._arrays[4:]:
+            column.append(0.0)
+        self.coefficients.extend([0.0] * self.STRIDE)
+
+        self.invalidate_row(screen._slot)
+
+    def remove(self, screen: Screen) -> None:
+        slot = screen._slot
+        if slot is None or self.screens[slot] is not screen:
+            return
+
+        del self.screens[slot]
+        for column in self._arrays:
+            del column[slot]
+        del self.coefficients[slot * self.STRIDE : (slot + 1) * self.STRIDE]
+        for moved in self.screens[slot:]:
+            moved._slot -= 1
+        screen._slot = None
+        self.grid.occupancy.discard(screen)
+
+        # Slots after the removed row have shifted.
+        if self._stale:
+            self._stale.clear()
+            self._dirty = True
+
+    def clear(self) -> None:
+        """Removes every screen at once."""
+        for screen in self.screens:
+            screen._slot = None
+        self.screens.clear()
+        for column in (*self._arrays, self.coefficients):
+            del column[:]
+        self._stale.clear()
+        self.grid.occupancy.clear()
+
+    # COMPUTER METHODS ========================================
+    def invalidate(self) -> None:
+        """Marks every row as outdated."""
+        self._dirty = True
+        self._stale.clear()
+
+    def invalidate_row(self, slot: int) -> None:
+        """Recompiles and reindexes a row after its spans or position changed and
+        marks it outdated."""
+        self.compile_row(slot)
+        self.grid.occupancy.place(self.screens[slot], *self.footprint(slot))
+        if not self._dirty:
+            self._stale.add(slot)
+
+    def update(self) -> None:
+        """Recomputes outdated rows."""
+        if self._dirty or len(self._stale) > len(self.screens) // 2:
+            self.compute()
+            return
+        while self._stale:
+            self.compute_row(self._stale.pop())
+
+    def footprint(self, slot: int) -> tuple[int, int, int, int]:
+        """Returns (colspan, rowspan, col, row) of a row."""
+        return (
+            self.colspans[slot],
+            self.rowspans[slot],
+            self.cols[slot],
+            self.rows[slot],
         )
 
-        # the "setters"
-        self.width = width
-        self.height = height
-        self.x = x
-        self.y = y
-        self.size = size
+    def compile_row(self, slot: int) -> None:
+        """Turns spans and position of a row into coefficients of the grid parameters."""
+
+        start = slot * self.STRIDE
+        self.coefficients[start : start + self.STRIDE] = array(
+            "d", span_coefficients(*self.footprint(slot))
+        )
+
+    def parameters(self) -> tuple[float, float, float, float, float, float]:
+        """Current grid parameters: col width, gutter w, left, row height, gutter h, bottom."""
+        grid = self.grid
+        gutter_w, gutter_h = grid.gutter
+        return (
+            grid.col_width,
+            gutter_w,
+            grid.margin.left,
+            grid.row_height,
+            gutter_h,
+            grid.margin.bottom,
+        )
 
-        self.values = {
+    def compute(self) -> None:
+        """Computes the geometry of every screen in one pass over the coefficients."""
+
+        col_width, gutter_w, left, row_height, gutter_h, bottom = self.parameters()
+
+        c, n = self.coefficients, self.STRIDE
+        self.widths[:] = product(c[0::n], c[1::n], col_width, gutter_w)
+        self.xs[:] = product(c[2::n], c[3::n], col_width, gutter_w, left)
+        self.heights[:] = product(c[4::n], c[5::n], row_height, gutter_h)
+        self.ys[:] = product(c[6::n], c[7::n], row_height, gutter_h, bottom)
+        self.sizes[:] = array("d", map(max, self.widths, self.heights))
+
+        self._stale.clear()
+        self._dirty = False
+
+    def compute_row(self, slot: int) -> None:
+        """Computes the geometry of a single screen from its coefficients."""
+
+        coefficients = self.coefficients[slot * self.STRIDE : (slot + 1) * self.STRIDE]
+        width, height, x, y = evaluate(coefficients, self.parameters())
+
+        self.widths[slot] = width
+        self.heights[slot] = height
+        self.sizes[slot] = max(width, height)
+        self.xs[slot] = x
+        self.ys[slot] = y
+
+    def span_values(
+        self, colspan: int, rowspan: int, col: int, row: int
+    ) -> dict[str, float | list[float]]:
+        """Values a screen would have at a given span, without creating it."""
+        coefficients = span_coefficients(colspan, rowspan, col, row)
+        width, height, x, y = evaluate(coefficients, self.parameters())
+        return {
             "Width": width,
             "Height": height,
             "Center": [x, y],
-            "Size": size,
+            "Size": max(width, height),
         }
 
-    def get_values(self) -> dict[str, int]:
-        return self.values
+    # EXPORT ========================================
+    def row_values(self, slot: int) -> dict[str, float | list[float]]:
+        return {
+            "Width": self.widths[slot],
+            "Height": self.heights[slot],
+            "Center": [self.xs[slot], self.ys[slot]],
+            "Size": self.sizes[slot],
+        }
 
+    @property
+    def values(self) -> "ScreenValues":
+        """Values of every screen, as a read-only sequence over the store."""
+        self.update()
+        return ScreenValues(self)
 
-class GridCell(Screen):
-    """Grid Cells are Screens of 1 col width x 1 row height that compose a grid."""
+    @property
+    def columns(self) -> dict[str, array]:
+        """Computed geometry of every screen, one array per value.
+        The arrays are copies, so holding them never blocks adding or removing
+        screens."""
+        self.update()
+        return {
+            "Width": array("d", self.widths),
+            "Height": array("d", self.heights),
+            "CenterX": array("d", self.xs),
+            "CenterY": array("d", self.ys),
+            "Size": array("d", self.sizes),
+        }
 
-    grid: Grid = None
-    all_blocks = None
 
-    def __init__(self, grid: Grid, index: int = None):
+def span_coefficients(
+    colspan: int, rowspan: int, col: int, row: int
+) -> tuple[float, ...]:
+    """Coefficients of width, x, height and y of a span, in ScreenStore order."""
+    col, row = col - 1, row - 1
+    return (
+        colspan,
+        colspan - 1,
+        colspan / 2 + col,
+        (colspan - 1) / 2 + col,
+        rowspan,
+        rowspan - 1,
+        rowspan / 2 + row,
+        (rowspan - 1) / 2 + row,
+    )
+
+
+def evaluate(
+    coefficients: Sequence[float], parameters: Sequence[float]
+) -> tuple[float, float, float, float]:
+    """Returns width, height, x and y of a single row of coefficients."""
+    w, w_g, x, x_g, h, h_g, y, y_g = coefficients
+    col_width, gutter_w, left, row_height, gutter_h, bottom = parameters
+    return (
+        w * col_width + w_g * gutter_w,
+        h * row_height + h_g * gutter_h,
+        x * col_width + x_g * gutter_w + left,
+        y * row_height + y_g * gutter_h + bottom,
+    )
+
+
+def product(
+    size_factors: array,
+    gutter_factors: array,
+    size: float,
+    gutter: float,
+    start: float = 0.0,
+) -> array:
+    """Evaluates start + a * size + b * gutter for every pair of factors."""
+    return array(
+        "d",
+        [start + a * size + b * gutter for a, b in zip(size_factors, gutter_factors)],
+    )
+
+
+class ScreenValues(Sequence):
+    """Sequence of screen values dicts that are built on access from a ScreenStore."""
+
+    def __init__(self, store: ScreenStore) -> None:
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, slot: int) -> dict[str, float | list[float]]:
+        if isinstance(slot, slice):
+            return [self[i] for i in range(*slot.indices(len(self)))]
+        if slot < 0:
+            slot += len(self)
+        if not 0 <= slot < len(self):
+            raise IndexError("screen index out of range")
+        self.store.update()
+        return self.store.row_values(slot)
+
+
+class Occupancy:
+    """Spatial index of the grid cells covered by screens.
+    Each grid row keeps a bitset of its occupied columns, so span overlap tests
+    cost one mask per row, and each occupied cell keeps the screens covering it.
+    Overlapping screens are counted, not overwritten, so the index stays exact
+    while screens are moved one by one (e.g. when flipping the whole grid)."""
+
+    def __init__(self) -> None:
+        self._rows: dict[int, int] = {}
+        self._owners: dict[tuple[int, int], list[Screen]] = {}
+        self._footprints: dict[Screen, tuple[int, int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._footprints)
+
+    # MAINTENANCE ========================================
+    def place(self, screen: Screen, colspan: int, rowspan: int, col: int, row: int):
+        """Indexes a screen at a new footprint, replacing its previous one.
+        Parts of the footprint before the first column or row are not indexed."""
+        colspan, col = clip_span(colspan, col)
+        rowspan, row = clip_span(rowspan, row)
+        footprint = (colspan, rowspan, col, row)
+        if self._footprints.get(screen) == footprint:
+            return
+        self.discard(screen)
 
-        if GridCell.grid is None:
-            GridCell.grid = grid
+        self._footprints[screen] = footprint
+        for r in range(row, row + rowspan):
+            self._rows[r] = self._rows.get(r, 0) | span_mask(colspan, col)
+            for c in range(col, col + colspan):
+                self._owners.setdefault((c, r), []).append(screen)
 
-        self._colspan = self._rowspan = 1
+    def discard(self, screen: Screen) -> None:
+        footprint = self._footprints.pop(screen, None)
+        if footprint is None:
+            return
 
-        if index is None:
-            self._col = self._row = 1
-        else:
-            self._col, self._row = get_coords(index, GridCell.grid.matrix)
-        self.index = index
+        colspan, rowspan, col, row = footprint
+        for r in range(row, row + rowspan):
+            for c in range(col, col + colspan):
+                owners = self._owners[(c, r)]
+                owners.remove(screen)
+                if not owners:
+                    del self._owners[(c, r)]
+                    self._rows[r] &= ~(1 << (c - 1))
+
+    def clear(self) -> None:
+        self._rows.clear()
+        self._owners.clear()
+        self._footprints.clear()
+
+    # QUERIES ========================================
+    def screen_at(self, col: int, row: int) -> Screen | None:
+        """Returns the screen covering a cell, if any."""
+        owners = self._owners.get((col, row))
+        return owners[-1] if owners else None
+
+    def overlaps(
+        self,
+        colspan: int,
+        rowspan: int,
+        col: int,
+        row: int,
+        ignore: Screen | None = None,
+    ) -> bool:
+        """Tells if a span covers any cell already taken by a screen other than ignore."""
+        mask = span_mask(colspan, col)
+        for r in range(row, row + rowspan):
+            hits = self._rows.get(r, 0) & mask
+            if not hits:
+                continue
+            if ignore is None:
+                return True
+            for c in range(col, col + colspan):
+                owners = self._owners.get((c, r), ())
+                if any(owner is not ignore for owner in owners):
+                    return True
+        return False
+
+    def free_regions(self, cols: int, rows: int) -> list[tuple[int, int, int, int]]:
+        """Returns free areas of a cols x rows grid as (colspan, rowspan, col, row).
+        Free runs of each row are merged with identical runs on the rows below."""
+
+        full = span_mask(cols, 1)
+        regions: list[list[int]] = []
+        open_regions: dict[tuple[int, int], list[int]] = {}
+
+        for row in range(1, rows + 1):
+            free = ~self._rows.get(row, 0) & full
+            runs: dict[tuple[int, int], list[int]] = {}
+
+            col = 1
+            while free:
+                if not free & 1:
+                    shift = (free & -free).bit_length() - 1
+                    free >>= shift
+                    col += shift
+                    continue
+                colspan = (~free & (free + 1)).bit_length() - 1
+                key = (colspan, col)
+                region = open_regions.get(key)
+                if region is None:
+                    region = [colspan, 0, col, row]
+                    regions.append(region)
+                region[1] += 1
+                runs[key] = region
+                free >>= colspan
+                col += colspan
+
+            open_regions = runs
+
+        return [tuple(region) for region in regions]
+
+
+def span_mask(colspan: int, col: int) -> int:
+    """Bitset of the columns covered by a span, column 1 being the lowest bit."""
+    colspan, col = clip_span(colspan, col)
+    return ((1 << colspan) - 1) << (col - 1)
+
+
+def clip_span(span: int, start: int) -> tuple[int, int]:
+    """Drops the part of a span that lies before position 1 (e.g. after a flip
+    of a screen that no longer fits the grid)."""
+    if start < 1:
+        span, start = max(span + start - 1, 0), 1
+    return span, start
+
+
+class GridMatrix:
+    """Read-only matrix of grid cell indexes, one row per grid row.
+    Indexes are worked out from the grid composition, so nothing is stored and
+    nothing needs rebuilding when the grid changes."""
+
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
 
-        self.compute()
-        self.grid.give_birth(self.compute)
-        self.grid.append_cell(self)
+    def __len__(self) -> int:
+        return self.grid.rows
 
-    @classmethod
-    def generate_all(cls, grid: Grid) -> list:
-        if cls.all_blocks is None:
-            cls.all_blocks = []
-        else:
-            cls.all_blocks.clear()
+    def __getitem__(self, row: int) -> range:
+        rows, cols = self.grid.rows, self.grid.cols
+        if row < 0:
+            row += rows
+        if not 0 <= row < rows:
+            raise IndexError("matrix row out of range")
+        start = row * cols + 1
+        return range(start, start + cols)
+
+    def __iter__(self):
+        for row in range(self.grid.rows):
+            yield self[row]
+
+    def __contains__(self, index: int) -> bool:
+        return 1 <= index <= self.grid.cols * self.grid.rows
+
+    def coords(self, index: int) -> tuple[int, int]:
+        """Returns (col, row) of a cell index, both starting at 1."""
+        if index not in self:
+            raise ValueError(f"{index} is not a cell of the grid")
+        row, col = divmod(index - 1, self.grid.cols)
+        return col + 1, row + 1
+
+    def index(self, col: int, row: int) -> int:
+        """Returns the cell index at (col, row), both starting at 1."""
+        return (row - 1) * self.grid.cols + col
+
+
+class GridGeometry:
+    """Computes the dimensions and positions of every grid cell at once.
+    Cells in the same column share their x center and cells in the same row share
+    their y center, so the whole grid is stored as one array per axis."""
 
-        for row in grid.matrix:
-            for index in row:
-                cls.all_blocks.append(GridCell(grid, index))
-        return cls.all_blocks
+    def __init__(self, grid: Grid) -> None:
+        self.grid = grid
+
+        self._width = self._height = 0.0
+        self._xs = array("d")
+        self._ys = array("d")
+
+        self._cells: list[GridCell] = []
+        self._cells_cols = 0
 
-    def compute(self):
-        grid = GridCell.grid
+    def compute(self) -> None:
+        """Computes cell centers for all columns and rows in a single pass."""
+
+        grid = self.grid
         margin = grid.margin
+        gutter_w, gutter_h = grid.gutter
 
-        x = (
-            grid.col_width / 2
-            + margin.left
-            + (self._col - 1) * (grid.col_width + grid.gutter[0])
-        )
-        y = (
-            grid.row_height / 2
-            + margin.bottom
-            + (self._row - 1) * (grid.row_height + grid.gutter[1])
-        )
-        # y = 1-y
+        width, height = grid.col_width, grid.row_height
+        step_x, step_y = width + gutter_w, height + gutter_h
+        start_x, start_y = width / 2 + margin.left, height / 2 + margin.bottom
 
-        self.width = grid.col_width
-        self.height = grid.row_height
-        self.x = x
-        self.y = y
+        self._width, self._height = width, height
+        self._xs = array("d", [start_x + col * step_x for col in range(grid.cols)])
+        self._ys = array("d", [start_y + row * step_y for row in range(grid.rows)])
+
+        self._resize_cells(grid.cols, grid.rows)
+
+    def _resize_cells(self, cols: int, rows: int) -> None:
+        """Grows or shrinks the cell pool to match the grid composition.
+        Existing cells are kept and only relabeled when the column count changes."""
+
+        cells = self._cells
+        count = cols * rows
+
+        if cols != self._cells_cols:
+            for cell in cells[:count]:
+                row, col = divmod(cell.index - 1, cols)
+                cell.col, cell.row = col + 1, row + 1
+            self._cells_cols = cols
+
+        if count < len(cells):
+            del cells[count:]
+            return
+
+        for index in range(len(cells) + 1, count + 1):
+            row, col = divmod(index - 1, cols)
+            cells.append(GridCell(self, index, col + 1, row + 1))
+
+    @property
+    def width(self) -> float:
+        self.grid.update()
+        return self._width
+
+    @property
+    def height(self) -> float:
+        self.grid.update()
+        return self._height
+
+    @property
+    def xs(self) -> array:
+        """X centers of every column."""
+        self.grid.update()
+        return self._xs
+
+    @property
+    def ys(self) -> array:
+        """Y centers of every row."""
+        self.grid.update()
+        return self._ys
+
+    def cell_at(self, x: float, y: float) -> int | None:
+        """Returns the index of the cell containing a normalized point,
+        or None if the point falls on a margin or a gutter."""
+
+        grid = self.grid
+        width, height = self.width, self.height
+        gutter_w, gutter_h = grid.gutter
+
+        col, dx = divmod(x - grid.margin.left, width + gutter_w)
+        row, dy = divmod(y - grid.margin.bottom, height + gutter_h)
+
+        if not (0 <= col < grid.cols and 0 <= row < grid.rows):
+            return None
+        if dx > width or dy > height:
+            return None
+        return int(row) * grid.cols + int(col) + 1
+
+    def nearest_cell(self, x: float, y: float) -> int:
+        """Returns the index of the cell containing a normalized point. Points on a
+        margin or a gutter snap to the closest cell."""
+
+        grid = self.grid
+        gutter_w, gutter_h = grid.gutter
+
+        col = nearest_step(x - grid.margin.left, self.width, gutter_w, grid.cols)
+        row = nearest_step(y - grid.margin.bottom, self.height, gutter_h, grid.rows)
+        return row * grid.cols + col + 1
+
+    def screen_at(self, x: float, y: float) -> "Screen | None":
+        """Returns the screen drawn under a normalized point, if any."""
+
+        grid = self.grid
+        col, row = grid.matrix.coords(self.nearest_cell(x, y))
+        screen = grid.occupancy.screen_at(col, row)
+        if screen is None:
+            return None
+
+        if (
+            abs(x - screen.x) > screen.width / 2
+            or abs(y - screen.y) > screen.height / 2
+        ):
+            return None
+        return screen
+
+    @property
+    def cells(self) -> list["GridCell"]:
+        """Persistent pool of cells, in index order."""
+        self.grid.update()
+        return self._cells
+
+
+def nearest_step(offset: float, size: float, gutter: float, count: int) -> int:
+    """Returns the 0-based block closest to offset along an axis of count blocks of
+    the given size separated by gutters."""
+    step, rest = divmod(offset, size + gutter)
+    if rest > size + gutter / 2:
+        step += 1
+    return int(min(max(step, 0), count - 1))
 
-        self.values = {
-            "Width": self.width,
-            "Height": self.height,
-            "Center": [x, y],
-            "Size": 1,
-        }
+
+class GridCell:
+    """Grid Cells are 1 col width x 1 row height views over the grid geometry."""
+
+    __slots__ = ("geometry", "index", "col", "row", "_values")
+
+    colspan = rowspan = 1
+
+    def __init__(
+        self, geometry: GridGeometry, index: int = 1, col: int = 1, row: int = 1
+    ):
+        self.geometry = geometry
+        self.index = index
+        self.col, self.row = col, row
+
+        self._values = {"Width": 0.0, "Height": 0.0, "Center": [0.0, 0.0], "Size": 1}
+
+    @property
+    def width(self) -> float:
+        return self.geometry.width
+
+    @property
+    def height(self) -> float:
+        return self.geometry.height
+
+    @property
+    def x(self) -> float:
+        return self.geometry.xs[self.col - 1]
+
+    @property
+    def y(self) -> float:
+        return self.geometry.ys[self.row - 1]
+
+    @property
+    def values(self) -> dict[str, float | list[float]]:
+        """Refreshes and returns the same dict every time."""
+        values = self._values
+        values["Width"] = self.width
+        values["Height"] = self.height
+        values["Center"][:] = self.x, self.y
+        return values
 
 
 # Exceptions (not yet implemented)
@@ -651,6 +1322,12 @@ class GutterExceedsCanvas(Exception):
     ...
 
 
+class ScreenDeleted(Exception):
+    """Error for when a deleted screen is read or edited."""
+
+    ...
+
+
 def test():
     canvas = Canvas()
     print(canvas)
@@ -45,6 +45,15 @@ class Comp:
     def AddTool(self, tool_id: str, x: int, y: int) -> Tool:
         return Tool(tool_id)
 
+    def Paste(self, settings: str) -> bool:
+        print(f"Pasting {settings.count(' = Input')} inputs.")
+        return True
+
+    def FindTool(self, name: str) -> Tool:
+        tool = Tool(name)
+        tool._attrs["TOOLS_Name"] = name
+        return tool
+
     @property
     def CurrentFrame(self):
         return CurrentFrame()
@@ -0,0 +1,136 @@
+from collections.abc import Sequence
+from .core import Grid
+
+# Serializes a layout into Fusion's .setting format, a Lua table that Fusion
+# pastes or loads in one go: a Background for the canvas, then per screen a
+# RectangleMask, a Transform and a Merge, chained on top of each other.
+
+INDENT = "\t"
+NODE_SPACING = (110, 33)
+
+
+# Lua values ==================================================================
+class Raw(str):
+    """Lua source that is written as is, e.g. Input { ... }."""
+
+
+def lua(value, depth: int = 0) -> str:
+    if isinstance(value, Raw):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    if isinstance(value, (list, tuple)):
+        return "{ " + ", ".join(lua(item, depth) for item in value) + " }"
+    if isinstance(value, dict):
+        return table(value, depth)
+    raise TypeError(f"Cannot write {type(value).__name__} as Lua.")
+
+
+def table(fields: dict, depth: int = 0, prefix: str = "") -> str:
+    """Writes a Lua table, one field per line."""
+    inner = INDENT * (depth + 1)
+    lines = [
+        f"{inner}{key} = {lua(value, depth + 1)}," for key, value in fields.items()
+    ]
+    return "\n".join([f"{prefix}{{", *lines, f"{INDENT * depth}}}"])
+
+
+def value_input(value) -> Raw:
+    return Raw(f"Input {{ Value = {lua(value)}, }}")
+
+
+def source_input(tool_name: str, output: str = "Output") -> Raw:
+    return Raw(f'Input {{ SourceOp = "{tool_name}", Source = "{output}", }}')
+
+
+def tool(tool_id: str, inputs: dict[str, Raw], pos: tuple[int, int], depth: int) -> Raw:
+    fields = {
+        "Inputs": Raw(table(inputs, depth + 1, prefix="ordered() ")),
+        "ViewInfo": Raw(f"OperatorInfo {{ Pos = {lua(pos)} }}"),
+    }
+    return Raw(table(fields, depth, prefix=f"{tool_id} "))
+
+
+# Layout ======================================================================
+def screen_tool_names(index: int) -> tuple[str, str, str]:
+    """Names of the mask, transform and merge of the screen at index (from 1)."""
+    return f"ScreenMask{index}", f"ScreenTransform{index}", f"ScreenMerge{index}"
+
+
+def layout_setting(grid: Grid) -> str:
+    """Returns the .setting text of the canvas and every screen of grid."""
+    return screens_setting(grid.canvas.resolution, grid.store.values)
+
+
+def screens_setting(
+    resolution: tuple[int, int], screen_values: Sequence[dict[str, float]]
+) -> str:
+    depth = 2
+    dx, dy = NODE_SPACING
+    width, height = resolution
+
+    tools = {
+        "Canvas": tool(
+            "Background",
+            {
+                "Width": value_input(width),
+                "Height": value_input(height),
+                "UseFrameFormatSettings": value_input(0),
+            },
+            (0, 0),
+            depth,
+        )
+    }
+
+    background = "Canvas"
+    for index, values in enumerate(screen_values, start=1):
+        mask, transform, merge = screen_tool_names(index)
+        y = index * dy
+
+        tools[mask] = tool(
+            "RectangleMask",
+            {
+                "Width": value_input(values["Width"]),
+                "Height": value_input(values["Height"]),
+                "Center": value_input(list(values["Center"])),
+            },
+            (dx * 2, y),
+            depth,
+        )
+        tools[transform] = tool(
+            "Transform",
+            {
+                "Center": value_input(list(values["Center"])),
+                "Size": value_input(values["Size"]),
+            },
+            (dx, y),
+            depth,
+        )
+        tools[merge] = tool(
+            "Merge",
+            {
+                "Background": source_input(background),
+                "Foreground": source_input(transform),
+                "EffectMask": source_input(mask, "Mask"),
+            },
+            (0, y),
+            depth,
+        )
+        background = merge
+
+    fields = {
+        "Tools": Raw(table(tools, depth - 1, prefix="ordered() ")),
+        "ActiveTool": background,
+    }
+    return table(fields) + "\n"
+
+
+def write_setting(grid: Grid, path: str) -> None:
+    """Writes the layout of grid to a .setting file, e.g. to load it offline."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(layout_setting(grid))
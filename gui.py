@@ -1,6 +1,9 @@
-from typing import Protocol
-from .core import Grid, GridCell
+from collections import deque
+from functools import partial
+from typing import Callable, Iterable, Protocol
+from .core import Grid, GridGeometry, Screen
 from dataclasses import dataclass
+import time
 import tkinter as tk
 from .style import colors
 
@@ -14,11 +17,14 @@ class Rectangle:
     parent: tk.Canvas
     screen_values: dict[str, float | list[float]]
     index: int = None
+    id: int = None
 
-    def compute(self):
+    def compute(self, canvas_width: float = None, canvas_height: float = None):
+        """Computes tk coordinates. Queries the parent's size unless it is given."""
 
-        canvas_width = self.parent.winfo_width()
-        canvas_height = self.parent.winfo_height()
+        if canvas_width is None or canvas_height is None:
+            canvas_width = self.parent.winfo_width()
+            canvas_height = self.parent.winfo_height()
 
         self.width, self.height, center, size = self.screen_values.values()
         self.x, self.y = center
@@ -35,8 +41,14 @@ class Rectangle:
         rectangle = self.parent.create_rectangle(
             self.x0, self.y0, self.x1, self.y1, **settings
         )
+        self.id = rectangle
         return rectangle
 
+    def move(self) -> int:
+        """Moves the already drawn item to the computed coordinates."""
+        self.parent.coords(self.id, self.x0, self.y0, self.x1, self.y1)
+        return self.id
+
     @property
     def corners(self) -> dict[tuple]:
         x, y = self.x, self.y
@@ -56,18 +68,115 @@ class Rectangle:
         return corners
 
 
+def transform(rects: list[Rectangle], canvas_width: float, canvas_height: float):
+    """Computes tk coordinates of many rectangles for the same canvas dimensions."""
+    for rect in rects:
+        rect.compute(canvas_width, canvas_height)
+
+
+def axis_mask(centers: Iterable[float], size: float, pixels: int) -> list[range]:
+    """Pixel ranges covered by blocks of the given normalized size along one axis."""
+    spans = []
+    for center in centers:
+        start = max(round((center - size / 2) * pixels), 0)
+        end = min(round((center + size / 2) * pixels), pixels)
+        if end > start:
+            spans.append(range(start, end))
+    return spans
+
+
+def rasterize_grid(
+    image: tk.PhotoImage,
+    geometry: GridGeometry,
+    width: int,
+    height: int,
+    block: str,
+    background: str,
+) -> None:
+    """Paints every grid block onto image. The grid is separable, so one row of
+    pixels is built and tiled over each band of grid rows: one put per row."""
+
+    row_pixels = [background] * width
+    for span in axis_mask(geometry.xs, geometry.width, width):
+        row_pixels[span.start : span.stop] = [block] * len(span)
+    row_data = "{" + " ".join(row_pixels) + "}"
+
+    image.put(background, to=(0, 0, width, height))
+    for span in axis_mask(geometry.ys, geometry.height, height):
+        # Fusion's y goes up, tk's goes down.
+        image.put(row_data, to=(0, height - span.stop, width, height - span.start))
+
+
+class RenderScheduler:
+    """Runs drawing jobs on the Tk event loop in chunks, spending at most budget_ms
+    per frame, so large layouts draw progressively while the UI stays responsive."""
+
+    FRAME_MS = 16
+
+    def __init__(self, widget: tk.Misc, budget_ms: float = 8) -> None:
+        self.widget = widget
+        self.budget = budget_ms / 1000
+        self._jobs: deque[Callable[[], None]] = deque()
+        self._after_id: str = None
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._jobs)
+
+    def submit(self, jobs: Iterable[Callable[[], None]]) -> None:
+        """Queues jobs, in priority order, after the ones already pending."""
+        self._jobs.extend(jobs)
+        if self._jobs and self._after_id is None:
+            self._after_id = self.widget.after_idle(self._run)
+
+    def cancel(self) -> None:
+        """Drops pending jobs, e.g. because a newer refresh makes them stale."""
+        self._jobs.clear()
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self) -> None:
+        """Runs every pending job right away."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        while self._jobs:
+            self._jobs.popleft()()
+
+    def _run(self) -> None:
+        self._after_id = None
+        deadline = time.perf_counter() + self.budget
+
+        while self._jobs:
+            self._jobs.popleft()()
+            if time.perf_counter() >= deadline:
+                break
+
+        if self._jobs:
+            self._after_id = self.widget.after(self.FRAME_MS, self._run)
+
+
 class SelectionRectangle:
+    FRAME_MS = 16
+
     def __init__(self, canvas: tk.Canvas):
         self.canvas = canvas
         self.item = None
+        self.start = self.end = None
+        self.blocked = False
+        self._after_id: str = None
 
     def draw(self, start: list[int, int], end: list[int, int], **opts):
         """Draw the rectangle"""
         return self.canvas.create_rectangle(*(list(start) + list(end)), **opts)
 
-    def autodraw(self, **opts):
-        """Setup automatic drawing; supports command option"""
+    def autodraw(self, preview: bool = False, **opts):
+        """Setup automatic drawing; supports command option.
+        With preview, shows the screen the selection will create, snapped to the
+        grid. The canvas must then provide snap_selection()."""
         self.start = None
+        self.preview = preview
         self.canvas.bind("<Button-1>", self.__update, "+")
         self.canvas.bind("<B1-Motion>", self.__update, "+")
         self.canvas.bind("<ButtonRelease-1>", self.__stop, "+")
@@ -77,16 +186,45 @@ class SelectionRectangle:
     def __update(self, event: tk.Event):
         if not self.start:
             self.start = [event.x, event.y]
+            # A press on an existing screen starts moving it, not a selection.
+            self.blocked = (
+                self.preview
+                and self.canvas.snap_selection(self.start, self.start) is None
+            )
             return
 
-        if self.item is not None:
-            self.canvas.delete(self.item)
-        self.item = self.draw(self.start, (event.x, event.y), **self.rectopts)
-        # self._command(self.start, (event.x, event.y))
+        # Motion events are coalesced, the item is redrawn at most once per frame.
+        self.end = (event.x, event.y)
+        if self._after_id is None:
+            self._after_id = self.canvas.after(self.FRAME_MS, self.__render)
+
+    def __render(self):
+        self._after_id = None
+        if not self.start or self.blocked:
+            return
+
+        coords, opts = list(self.start) + list(self.end), self.rectopts
+        if self.preview:
+            snapped = self.canvas.snap_selection(self.start, self.end)
+            if snapped is None:
+                return
+            coords, preview_opts = snapped
+            opts = {**opts, **preview_opts}
+
+        if self.item is None:
+            self.item = self.canvas.create_rectangle(*coords, **opts)
+            return
+        self.canvas.coords(self.item, *coords)
+        if self.preview:
+            self.canvas.itemconfig(self.item, **preview_opts)
 
     def __stop(self, event: tk.Event):
         self.start = None
-        self.canvas.delete(self.item)
+        if self._after_id is not None:
+            self.canvas.after_cancel(self._after_id)
+            self._after_id = None
+        if self.item is not None:
+            self.canvas.delete(self.item)
         self.item = None
 
 
@@ -115,6 +253,9 @@ class GUI(Protocol):
     def undraw_screens(self, *ids: int) -> None:
         raise NotImplementedError()
 
+    def redraw_screen(self, id: int, screen_values: dict[str, float]) -> None:
+        raise NotImplementedError()
+
     def refresh(self, screen_values: list[dict[str, float]] | None) -> list[int] | None:
         """
         Refreshes grid and user created screens if there are any.
@@ -126,6 +267,15 @@ class GUI(Protocol):
     def grid_blocks(self):
         raise NotImplementedError()
 
+    def find_cell(self, coords: tuple[float, float], snap: bool = False) -> int | None:
+        raise NotImplementedError()
+
+    def find_screen(self, coords: tuple[float, float]) -> Screen | None:
+        raise NotImplementedError()
+
+    def normalize(self, x: float, y: float) -> tuple[float, float]:
+        raise NotImplementedError()
+
 
 class ScreenSplitterGUI(tk.Canvas):
     def __init__(
@@ -140,10 +290,30 @@ class ScreenSplitterGUI(tk.Canvas):
         self.max_width = max_width
         self.max_height = max_height
 
-        self._grid_blocks: list[Rectangle] = None
-        self.grid_block_ids: list[int] = None
+        self._grid_blocks: dict[int, Rectangle] = {}
+        self.screen_rects: list[Rectangle] = []
+        self._screen_rects_by_id: dict[int, Rectangle] = {}
         self.handler: Handler = None
 
+        # Grids up to this many cells are drawn in one go, bigger ones in chunks.
+        self.chunking_threshold = 2000
+        # Grids with more cells are painted as a single image ("bitmap" mode).
+        self.bitmap_threshold = 5000
+        self.grid_mode = "auto"
+        self._grid_image: tk.PhotoImage = None
+        self._grid_image_id: int = None
+        self._grid_hover_id: int = None
+        self.scheduler = RenderScheduler(self)
+        self.pointer: tuple[int, int] = None
+        self.bind("<Motion>", self.on_motion, add="+")
+
+        # Kept up to date through <Configure>, so drawing never waits on Tk.
+        # The widget may be given more room than it asks for; drawing then
+        # uses the largest size with the Fusion canvas aspect ratio that fits.
+        self.canvas_width, self.canvas_height = self.compute_canvas_dimensions()
+        self.available_size: tuple[int, int] = None
+        self.bind("<Configure>", self.on_configure, add="+")
+
         self.config(
             background=colors.CANVAS_BG,
             bd=0,
@@ -153,47 +323,206 @@ class ScreenSplitterGUI(tk.Canvas):
 
         selection_rectangle = SelectionRectangle(self)
         selection_rectangle.autodraw(
-            fill="", width=0.5, outline=colors.TEXT_DARKER, dash=(4, 4)
+            preview=True, fill="", width=0.5, outline=colors.TEXT_DARKER, dash=(4, 4)
         )
 
     # PROTOCOL METHODS  =======================================================
     def draw_grid(self) -> None:
-        self.update()
-        grid_cells = GridCell.generate_all(self.ss_grid)
+        """Draws grid blocks, reusing the items that are already on the canvas.
+        Only blocks for cells that were added or removed are created or deleted.
+        Big grids are drawn row by row through the render scheduler, starting
+        with the rows under the pointer. Pending rows of a previous call are dropped.
+        """
+        self.scheduler.cancel()
 
-        rects: list[Rectangle] = []
-        for cell in grid_cells:
-            rect = Rectangle(self, cell.values, cell.index)
-            rects.append(rect)
+        if self.uses_bitmap:
+            self.draw_grid_bitmap()
+            return
+        self.undraw_grid_bitmap()
+
+        grid = self.ss_grid
+        count = grid.cols * grid.rows
+
+        blocks = self._grid_blocks
+        surplus = [index for index in blocks if index > count]
+        if surplus:
+            self.delete(*[blocks.pop(index).id for index in surplus])
+
+        gutter_too_small = grid.margin.get_gutter() < 4
+        outline = colors.CANVAS_BLOCK if not gutter_too_small else colors.CANVAS_BG
+        if blocks:
+            self.itemconfig("grid_block", outline=outline, activeoutline=outline)
+
+        jobs = [
+            partial(self.draw_grid_row, row, outline) for row in self.rows_by_priority()
+        ]
+        if count <= self.chunking_threshold:
+            for job in jobs:
+                job()
+            return
+        self.scheduler.submit(jobs)
 
-        self.grid_blocks = rects
+    @property
+    def uses_bitmap(self) -> bool:
+        if self.grid_mode == "auto":
+            return self.ss_grid.cols * self.ss_grid.rows > self.bitmap_threshold
+        return self.grid_mode == "bitmap"
 
-        gutter_too_small = self.ss_grid.margin.get_gutter() < 4
+    def draw_grid_bitmap(self) -> None:
+        """Paints the whole grid into one image, with a single hover rectangle."""
+        if self._grid_blocks:
+            self.delete("grid_block")
+            self._grid_blocks.clear()
 
-        rect_ids: list[int] = []
-        for rect in rects:
-            rect_id = rect.compute().draw(
+        width, height = round(self.canvas_width), round(self.canvas_height)
+
+        if self._grid_image is None:
+            self._grid_image = tk.PhotoImage(master=self, width=width, height=height)
+        else:
+            self._grid_image.blank()
+            self._grid_image.configure(width=width, height=height)
+
+        rasterize_grid(
+            self._grid_image,
+            self.ss_grid.geometry,
+            width,
+            height,
+            colors.CANVAS_BLOCK,
+            colors.CANVAS_BG,
+        )
+
+        if self._grid_image_id is None:
+            self._grid_image_id = self.create_image(
+                0, 0, anchor=tk.NW, image=self._grid_image, tag="grid_image"
+            )
+            self._grid_hover_id = self.create_rectangle(
+                0,
+                0,
+                0,
+                0,
+                fill=colors.CANVAS_BLOCK_HOVER,
+                outline=colors.CANVAS_BLOCK_HOVER,
+                state=tk.HIDDEN,
+                tag="grid_hover",
+            )
+            self.tag_lower("grid_hover")
+            self.tag_lower("grid_image")
+
+        self.move_grid_hover()
+
+    def undraw_grid_bitmap(self) -> None:
+        if self._grid_image_id is None:
+            return
+        self.delete(self._grid_image_id, self._grid_hover_id)
+        self._grid_image_id = self._grid_hover_id = None
+
+    def move_grid_hover(self) -> None:
+        """Moves the hover rectangle of bitmap mode to the cell under the pointer."""
+        if self._grid_hover_id is None:
+            return
+
+        index = None
+        if self.pointer is not None:
+            index = self.find_cell(self.normalize(*self.pointer))
+        if index is None:
+            self.itemconfig(self._grid_hover_id, state=tk.HIDDEN)
+            return
+
+        cell = self.ss_grid.cells[index - 1]
+        rect = Rectangle(self, cell.values, index, self._grid_hover_id)
+        rect.compute(self.canvas_width, self.canvas_height).move()
+        self.itemconfig(self._grid_hover_id, state=tk.NORMAL)
+
+    def find_cell(self, coords: tuple[float, float], snap: bool = False) -> int | None:
+        """Returns the index of the grid cell at normalized coords. Coords on a margin
+        or a gutter return None, or the closest cell if snap is True."""
+        geometry = self.ss_grid.geometry
+        if snap:
+            return geometry.nearest_cell(*coords)
+        return geometry.cell_at(*coords)
+
+    def find_screen(self, coords: tuple[float, float]) -> Screen | None:
+        """Returns the screen drawn at normalized coords, if any."""
+        return self.ss_grid.geometry.screen_at(*coords)
+
+    def normalize(self, x: float, y: float) -> tuple[float, float]:
+        """Converts tk canvas coordinates to normalized Fusion coordinates."""
+        return x / self.canvas_width, 1 - y / self.canvas_height
+
+    def snap_selection(
+        self, start: tuple[int, int], end: tuple[int, int]
+    ) -> tuple[list[float], dict[str, str]] | None:
+        """Returns tk coordinates and item options of the screen that a selection
+        between two canvas points would create, or None if it starts on a screen."""
+        grid = self.ss_grid
+
+        first, last = self.normalize(*start), self.normalize(*end)
+        if self.find_screen(first) is not None:
+            return None
+
+        span = Screen.span_from_coords(
+            grid, self.find_cell(first, snap=True), self.find_cell(last, snap=True)
+        )
+        rect = Rectangle(self, grid.store.span_values(*span))
+        rect.compute(self.canvas_width, self.canvas_height)
+
+        color = colors.CANVAS_SCREEN_HOVER
+        if grid.occupancy.overlaps(*span):
+            color = colors.CANVAS_SCREEN_PRE_DELETE
+        return [rect.x0, rect.y0, rect.x1, rect.y1], {"fill": color, "outline": color}
+
+    def draw_grid_row(self, row: int, outline: str) -> None:
+        """Draws or moves the blocks of one grid row."""
+        grid = self.ss_grid
+        if row > grid.rows:
+            return
+
+        cells = grid.cells
+        blocks = self._grid_blocks
+        canvas_width, canvas_height = self.canvas_width, self.canvas_height
+
+        added = False
+        start = (row - 1) * grid.cols
+        for cell in cells[start : start + grid.cols]:
+            rect = blocks.get(cell.index)
+            if rect is not None:
+                rect.screen_values = cell.values
+                rect.compute(canvas_width, canvas_height).move()
+                continue
+
+            rect = Rectangle(self, cell.values, cell.index)
+            rect.compute(canvas_width, canvas_height).draw(
                 fill=colors.CANVAS_BLOCK,
                 activefill=colors.CANVAS_BLOCK_HOVER,
-                outline=colors.CANVAS_BLOCK
-                if not gutter_too_small
-                else colors.CANVAS_BG,
-                activeoutline=colors.CANVAS_BLOCK
-                if not gutter_too_small
-                else colors.CANVAS_BG,
+                outline=outline,
+                activeoutline=outline,
                 activewidth=1,
+                tag="grid_block",
             )
-            rect_ids.append(rect_id)
+            blocks[cell.index] = rect
+            added = True
 
-        self.grid_block_ids = rect_ids
+        # New blocks are created on top, screens must stay above them.
+        if added:
+            self.tag_raise("screen")
 
-    def draw_screen(self, screen_values: dict[str, float | list[float]]) -> int:
-        self.update()
+    def rows_by_priority(self) -> list[int]:
+        """Grid rows ordered outwards from the row under the pointer."""
+        rows = self.ss_grid.rows
+        if self.pointer is None:
+            return list(range(rows, 0, -1))
+
+        y = 1 - self.pointer[1] / self.canvas_height
+        hovered = min(max(int(y * rows) + 1, 1), rows)
+        return sorted(range(1, rows + 1), key=lambda row: abs(row - hovered))
 
+    def draw_screen(self, screen_values: dict[str, float | list[float]]) -> int:
         rect = Rectangle(self, screen_values)
-        rect_id = rect.compute().draw(
+        rect_id = rect.compute(self.canvas_width, self.canvas_height).draw(
             fill=colors.CANVAS_SCREEN, outline=colors.CANVAS_SCREEN, tag="screen"
         )
+        self.screen_rects.append(rect)
+        self._screen_rects_by_id[rect_id] = rect
 
         self.bind_screen(rect_id)
 
@@ -202,36 +531,59 @@ class ScreenSplitterGUI(tk.Canvas):
     def undraw_screens(self, *ids: int) -> None:
         self.delete(*ids)
 
+        ids = set(ids)
+        self.screen_rects = [rect for rect in self.screen_rects if rect.id not in ids]
+        for id in ids:
+            self._screen_rects_by_id.pop(id, None)
+
+    def redraw_screen(self, id: int, screen_values: dict[str, float]) -> None:
+        """Moves a single screen item, e.g. while it is being dragged."""
+        rect = self._screen_rects_by_id[id]
+        rect.screen_values = screen_values
+        rect.compute(self.canvas_width, self.canvas_height).move()
+
     def refresh(
         self, screen_values: list[dict[str, float]] | None = None
     ) -> list[int] | None:
         """
         Refreshes grid and user created screens if there are any.
-        In that case, returns a list of their new rectangle IDs.
+        In that case, returns a list of their rectangle IDs, which are kept
+        for screens that were already drawn.
         """
 
-        self.delete("screen")
-        self.delete(*self.grid_block_ids)
-
         self.draw_canvas()
-        self.draw_grid()
 
-        rect_ids: list[int] = None
-        if screen_values:
-            rect_ids = []
-            for values in screen_values:
-                rect_id = self.draw_screen(values)
-                rect_ids.append(rect_id)
+        screen_values = screen_values or ()
+        rects = self.screen_rects
+
+        surplus = rects[len(screen_values) :]
+        if surplus:
+            self.undraw_screens(*[rect.id for rect in surplus])
+            rects = self.screen_rects
+
+        for rect, values in zip(rects, screen_values):
+            rect.screen_values = values
+        transform(rects, self.canvas_width, self.canvas_height)
+        for rect in rects:
+            rect.move()
 
-        return rect_ids
+        for values in screen_values[len(rects) :]:
+            self.draw_screen(values)
+
+        # Screens are drawn first, the grid may take several frames.
+        self.draw_grid()
+
+        if not self.screen_rects:
+            return None
+        return [rect.id for rect in self.screen_rects]
 
     @property
-    def grid_blocks(self):
-        return self._grid_blocks
+    def grid_blocks(self) -> list[Rectangle]:
+        return list(self._grid_blocks.values())
 
-    @grid_blocks.setter
-    def grid_blocks(self, value):
-        self._grid_blocks = value
+    @property
+    def grid_block_ids(self) -> list[int]:
+        return [rect.id for rect in self._grid_blocks.values()]
 
     # =========================================================================
 
@@ -249,11 +601,52 @@ class ScreenSplitterGUI(tk.Canvas):
         )
         self.tag_bind(id, "<Button-2> <ButtonRelease-2>", self.handler.on_delete_screen)
 
+    def on_configure(self, event: tk.Event) -> None:
+        """Rescales the existing items when the canvas is resized by its window.
+        Grid geometry is normalized, so no layout is recomputed and nothing is
+        sent to Resolve; only a bitmap grid is repainted, once Tk is idle."""
+        if event.width < 1 or event.height < 1:
+            return
+        self.available_size = (event.width, event.height)
+
+        width, height = self.fit_dimensions(*self.available_size)
+        old_width, old_height = self.canvas_width, self.canvas_height
+        self.canvas_width, self.canvas_height = width, height
+
+        # Tk rounds the size it was given by draw_canvas.
+        if abs(width - old_width) < 1 and abs(height - old_height) < 1:
+            return
+        if not old_width or not old_height:
+            return
+
+        # Both sizes have the canvas aspect ratio, so this scales uniformly.
+        self.scale("all", 0, 0, width / old_width, height / old_height)
+
+        if self._grid_image_id is not None:
+            self.scheduler.cancel()
+            self.scheduler.submit([self.draw_grid_bitmap])
+
+    def on_motion(self, event: tk.Event) -> None:
+        self.pointer = (event.x, event.y)
+        self.move_grid_hover()
+
     # Self drawing funcs
     def draw_canvas(self) -> None:
+        """Asks for the size fitting max_width and max_height, but draws within
+        the size Tk last gave the widget, if any."""
         canvas_width, canvas_height = self.compute_canvas_dimensions()
         self.config(width=canvas_width, height=canvas_height)
-        self.update()
+
+        if self.available_size is not None:
+            canvas_width, canvas_height = self.fit_dimensions(*self.available_size)
+        self.canvas_width, self.canvas_height = canvas_width, canvas_height
+
+    def fit_dimensions(self, width: float, height: float) -> tuple[float, float]:
+        """Largest size with the aspect ratio of the Fusion canvas within width and height."""
+        aspect_ratio = self.ss_grid.canvas.aspect_ratio
+        if width / aspect_ratio <= height:
+            return width, width / aspect_ratio
+        return height * aspect_ratio, height
 
     def compute_canvas_dimensions(self) -> tuple[int]:
         canvas = self.ss_grid.canvas
@@ -1,25 +1,15 @@
 from dataclasses import dataclass
 import tkinter as tk
-from .gui import GUI, Rectangle
+from .gui import GUI
 from .style import colors
 from .controller import Controller
-from .utils import is_within
+from .core import Screen
 from . import instructions
 
 
-def find_grid_block_within(
-    coords: tuple[float, float], grid_blocks: list[Rectangle]
-) -> Rectangle:
-    return next(
-        (block for block in grid_blocks if is_within(coords, block.corners)),
-        None,
-    )
-
-
 def get_event_coords_normalized(event: tk.Event) -> tuple[float, float]:
-    self: tk.Widget = event.widget
-    coords = (event.x / self.winfo_width(), 1 - event.y / self.winfo_height())
-    return coords
+    canvas: GUI = event.widget
+    return canvas.normalize(event.x, event.y)
 
 
 @dataclass
@@ -35,33 +25,49 @@ class EventHandler:
         self.new_screen_indexes: tuple[int, int] = None
         self.gui.bind("<Button-1>", self.on_click_canvas, add="+")
         self.gui.bind("<ButtonRelease-1>", self.on_release_canvas, add="+")
+        self.gui.bind("<B1-Motion>", self.on_drag_screen, add="+")
         self.status = tk.StringVar()
 
+        self.screen_edit: dict = None
+        self._screen_edit_after: str = None
+        self._settings_after: str = None
+
+    # Settings ================================================================
+    SETTINGS_DEBOUNCE_MS = 50
+
     def on_change_setting(self=None, key: str = None, var: tk.IntVar = None) -> None:
-        self.controller.change_setting(key, var.get())
+        """Setting changes are queued, and a burst of them (tabbing through entries,
+        linking margins) is applied at once after a short pause."""
+        self.controller.queue_setting(key, var.get())
+
+        if self._settings_after is not None:
+            self.gui.after_cancel(self._settings_after)
+        self._settings_after = self.gui.after(
+            self.SETTINGS_DEBOUNCE_MS, self.apply_settings
+        )
+
+    def apply_settings(self) -> None:
+        self._settings_after = None
+        self.controller.flush_settings()
 
     # Click and Drag on Canvas ================================================
     def on_click_canvas(self, event: tk.Event) -> None:
         canvas: GUI = event.widget
 
-        item = canvas.find_closest(event.x, event.y)
-        if canvas.itemcget(item, "fill") == colors.CANVAS_SCREEN:
+        coords = get_event_coords_normalized(event)
+        screen = canvas.find_screen(coords)
+        if screen is not None:
             self.new_screen_coords = None
+            self.start_screen_edit(event, screen)
             return
 
-        coords = get_event_coords_normalized(event)
         self.new_screen_coords = coords
-        block = find_grid_block_within(coords, canvas.grid_blocks)
-
-        if block is not None:
-            index = block.index
-            self.new_screen_indexes = index
-            return
-        self.new_screen_indexes = None
+        self.new_screen_indexes = canvas.find_cell(coords, snap=True)
 
     created_first_screen = False
 
     def on_release_canvas(self, event: tk.Event) -> None:
+        self.stop_screen_edit()
         if self.new_screen_coords is None:
             return
 
@@ -71,9 +77,8 @@ class EventHandler:
 
         self.new_screen_coords = (self.new_screen_coords, coords)
 
-        block = find_grid_block_within(coords, canvas.grid_blocks)
-        if block is not None:
-            index = block.index
+        index = canvas.find_cell(coords, snap=True)
+        if index is not None:
             self.new_screen_indexes = (self.new_screen_indexes, index)
             self.controller.do_command("add_screen", self.new_screen_indexes)
 
@@ -85,6 +90,87 @@ class EventHandler:
 
         self.new_screen_indexes = None
 
+    # Moving and Resizing Screens ============================================
+    EDGE_PX = 6
+
+    def start_screen_edit(self, event: tk.Event, screen: Screen) -> None:
+        """Dragging a screen moves it; dragging near one of its edges resizes it."""
+        canvas: GUI = event.widget
+        rect_id = self.controller.screens.by_screen(screen).rectangle
+        x0, y0, x1, y1 = canvas.coords(rect_id)
+
+        edges = set()
+        if event.x - x0 <= self.EDGE_PX:
+            edges.add("left")
+        if x1 - event.x <= self.EDGE_PX:
+            edges.add("right")
+        if event.y - y0 <= self.EDGE_PX:
+            edges.add("top")
+        if y1 - event.y <= self.EDGE_PX:
+            edges.add("bottom")
+
+        index = canvas.find_cell(get_event_coords_normalized(event), snap=True)
+        self.screen_edit = {
+            "rect_id": rect_id,
+            "span": (screen.colspan, screen.rowspan, screen.col, screen.row),
+            "start": self.controller.grid.matrix.coords(index),
+            "edges": edges,
+            "event": None,
+        }
+
+    def on_drag_screen(self, event: tk.Event) -> None:
+        """Motion events are coalesced, the screen is updated at most once per frame."""
+        if self.screen_edit is None:
+            return
+        self.screen_edit["event"] = event
+        if self._screen_edit_after is None:
+            self._screen_edit_after = self.gui.after(16, self.update_screen_edit)
+
+    def update_screen_edit(self) -> None:
+        self._screen_edit_after = None
+        edit = self.screen_edit
+        if edit is None or edit["event"] is None:
+            return
+
+        grid = self.controller.grid
+        coords = get_event_coords_normalized(edit["event"])
+        index = self.gui.find_cell(coords, snap=True)
+        col, row = grid.matrix.coords(index)
+        colspan, rowspan, start_col, start_row = edit["span"]
+        edges = edit["edges"]
+
+        if not edges:
+            dcol, drow = col - edit["start"][0], row - edit["start"][1]
+            # A screen wider or taller than the grid (after cols or rows shrank)
+            # keeps its first cell in the grid; edit_screen then rejects it.
+            start_col = max(min(start_col + dcol, grid.cols - colspan + 1), 1)
+            start_row = max(min(start_row + drow, grid.rows - rowspan + 1), 1)
+        else:
+            end_col, end_row = start_col + colspan - 1, start_row + rowspan - 1
+            if "left" in edges:
+                start_col = min(col, end_col)
+            if "right" in edges:
+                end_col = max(col, start_col)
+            # Rows count upwards, the top edge is the last row.
+            if "bottom" in edges:
+                start_row = min(row, end_row)
+            if "top" in edges:
+                end_row = max(row, start_row)
+            colspan, rowspan = end_col - start_col + 1, end_row - start_row + 1
+
+        self.controller.do_command(
+            "edit_screen", (edit["rect_id"], colspan, rowspan, start_col, start_row)
+        )
+
+    def stop_screen_edit(self) -> None:
+        if self.screen_edit is None:
+            return
+        if self._screen_edit_after is not None:
+            self.gui.after_cancel(self._screen_edit_after)
+            self._screen_edit_after = None
+            self.update_screen_edit()
+        self.screen_edit = None
+
     # Deleting Screens ========================================================
     user_wants_to_delete: bool = True
 
@@ -92,7 +178,7 @@ class EventHandler:
         if self.status.get() == instructions.DELETE_SCREEN:
             self.status.set("")
         canvas: tk.Canvas = event.widget
-        rect_id = canvas.find_closest(event.x, event.y)[0]
+        rect_id = canvas.find_withtag(tk.CURRENT)[0]
         canvas.itemconfig(
             rect_id,
             fill=colors.CANVAS_SCREEN_PRE_DELETE,
@@ -105,7 +191,7 @@ class EventHandler:
             return "break"
 
         canvas: tk.Canvas = event.widget
-        rect_id = canvas.find_closest(event.x, event.y)[0]
+        rect_id = canvas.find_withtag(tk.CURRENT)[0]
 
         self.controller.do_command("delete_screen", rect_id)
 
@@ -0,0 +1,242 @@
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future
+import threading
+from .fusion_alias import Tool
+from .resolve_api import ResolveAPI
+
+
+class Pending:
+    """Stands for (part of) the result of a queued call, e.g. the tools of a
+    screen still being added. Indexing it never blocks; the worker swaps it for
+    the real value before passing it to the wrapped ResolveAPI."""
+
+    __slots__ = ("future", "path")
+
+    def __init__(self, future: Future, path: tuple[int, ...] = ()) -> None:
+        self.future = future
+        self.path = path
+
+    def __getitem__(self, index: int) -> "Pending":
+        return Pending(self.future, self.path + (index,))
+
+    @property
+    def failed(self) -> bool:
+        """Tells if the call this stands for raised, or was dropped."""
+        future = self.future
+        if not future.done():
+            return False
+        return future.cancelled() or future.exception() is not None
+
+    def resolve(self):
+        value = self.future.result()
+        for index in self.path:
+            value = value[index]
+        return value
+
+
+def has_failed(value) -> bool:
+    """Tells if value holds a Pending whose call failed."""
+    if isinstance(value, Pending):
+        return value.failed
+    if isinstance(value, (list, tuple)):
+        return any(has_failed(item) for item in value)
+    if isinstance(value, dict):
+        return any(has_failed(item) for item in value.values())
+    return False
+
+
+def without_failed_screens(
+    resolution: tuple[int, int],
+    screen_tools: list[tuple[Tool, Tool]],
+    screen_values: list[dict[str, float]] | None,
+) -> tuple:
+    """Arguments of refresh_global without the screens whose add failed."""
+    kept = [i for i, tools in enumerate(screen_tools) if not has_failed(tools)]
+    if len(kept) == len(screen_tools):
+        return resolution, screen_tools, screen_values
+
+    screen_tools = [screen_tools[i] for i in kept]
+    if screen_values is not None:
+        screen_values = [screen_values[i] for i in kept]
+    return resolution, screen_tools, screen_values
+
+
+def resolve(value):
+    """Replaces Pending values, also inside lists, tuples and dicts."""
+    if isinstance(value, Pending):
+        return value.resolve()
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item) for item in value)
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    return value
+
+
+class Command:
+    __slots__ = ("name", "args", "kwargs", "future", "placeholders")
+
+    def __init__(self, name: str, args: tuple, kwargs: dict) -> None:
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        # Pending values handed out for the result, reported if the call fails.
+        self.placeholders: list[Pending] = []
+
+
+class QueuedResolveAPI:
+    """Runs the calls of a ResolveAPI on a worker thread, so Tk never waits on
+    Fusion. Calls keep their order, except that a new refresh_global replaces
+    any pending one, and a new update_screen is merged into a pending one for
+    the same tools. Use wait() to block until Fusion has caught up.
+
+    Tools of a failed add are skipped by later calls, and reported by
+    take_failed(), so that the Controller can remove their screens."""
+
+    def __init__(self, api: ResolveAPI) -> None:
+        self.api = api
+
+        self._queue: deque[Command] = deque()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._error: BaseException = None
+        self._failed: list[Pending] = []
+
+        self._worker = threading.Thread(
+            target=self._run, name="ResolveAPI", daemon=True
+        )
+        self._worker.start()
+
+    # ResolveAPI methods ======================================================
+    def refresh_global(
+        self,
+        resolution: tuple[int, int],
+        screen_tools: list[tuple[Tool, Tool]],
+        screen_values: Sequence[dict[str, float]] | None = None,
+    ) -> None:
+        # Values are read from the grid now, it may change before the call runs.
+        if screen_values is not None:
+            screen_values = [dict(values) for values in screen_values]
+        with self._condition:
+            self._discard(lambda command: command.name == "refresh_global")
+            self._put("refresh_global", (resolution, list(screen_tools), screen_values))
+
+    def add_canvas(self, width: int, height: int) -> None:
+        self._submit("add_canvas", width, height)
+
+    def add_screen(self, **values) -> Pending:
+        with self._condition:
+            command = self._put("add_screen", (), values)
+            command.placeholders = [Pending(command.future)]
+        return command.placeholders[0]
+
+    def add_screens(self, values_list: Sequence[dict[str, float]]) -> list[Pending]:
+        values_list = [dict(values) for values in values_list]
+        with self._condition:
+            command = self._put("add_screens", (values_list,))
+            command.placeholders = [
+                Pending(command.future, (i,)) for i in range(len(values_list))
+            ]
+        return list(command.placeholders)
+
+    def paste_layout(self, setting: str) -> list[tuple[Tool, Tool, Tool]]:
+        """Waits for the paste, the number of tools it returns is not known before."""
+        return self._submit("paste_layout", setting).future.result()
+
+    def update_screen(self, tools: tuple[Tool, Tool, Tool], **values) -> None:
+        with self._condition:
+            for command in self._queue:
+                if command.name == "update_screen" and command.args[0] is tools:
+                    values = {**command.kwargs, **values}
+            self._discard(
+                lambda command: command.name == "update_screen"
+                and command.args[0] is tools
+            )
+            self._put("update_screen", (tools,), values)
+
+    def delete_screen(self, tools: tuple[Tool, Tool, Tool]) -> None:
+        self._submit("delete_screen", tools)
+
+    def delete_all_screens(self) -> None:
+        self._submit("delete_all_screens")
+
+    # Queue ===================================================================
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until every queued call has run. Returns False on timeout.
+        Raises the first error a call ran into since the last wait."""
+        with self._condition:
+            done = self._condition.wait_for(
+                lambda: not self._queue and not self._busy, timeout
+            )
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return done
+
+    def take_failed(self) -> list[Pending]:
+        """Returns the tools handed out by add_screen and add_screens whose call
+        failed since the last call, so their screens can be removed."""
+        with self._condition:
+            failed, self._failed = self._failed, []
+        return failed
+
+    def close(self) -> None:
+        """Runs the calls still queued, then stops the worker."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def _submit(self, name: str, *args, **kwargs) -> Command:
+        with self._condition:
+            return self._put(name, args, kwargs)
+
+    def _put(self, name: str, args: tuple, kwargs: dict = None) -> Command:
+        if self._closed:
+            raise RuntimeError("The ResolveAPI queue is closed.")
+        command = Command(name, args, kwargs or {})
+        self._queue.append(command)
+        self._condition.notify_all()
+        return command
+
+    def _discard(self, predicate) -> None:
+        """Drops pending commands, whose results must not be waited on."""
+        kept = [command for command in self._queue if not predicate(command)]
+        for command in self._queue:
+            if predicate(command):
+                command.future.cancel()
+        self._queue = deque(kept)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                command = self._queue.popleft()
+                self._busy = True
+
+            try:
+                args, kwargs = command.args, command.kwargs
+                if command.name == "refresh_global":
+                    args = without_failed_screens(*args)
+                if has_failed((args, kwargs)):
+                    # Refers to the tools of a screen whose add failed.
+                    result = None
+                else:
+                    method = getattr(self.api, command.name)
+                    result = method(*resolve(args), **resolve(kwargs))
+            except BaseException as error:
+                with self._condition:
+                    if self._error is None:
+                        self._error = error
+                    self._failed.extend(command.placeholders)
+                command.future.set_exception(error)
+            else:
+                command.future.set_result(result)
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
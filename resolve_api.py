@@ -1,5 +1,136 @@
+from collections import deque
+from collections.abc import Sequence
 from typing import Protocol
-from .fusion_alias import Tool
+from .fusion_alias import Comp, Flow, Tool
+
+InputValue = float | int | str | list[float]
+
+
+def same_value(a: InputValue, b: InputValue, tolerance: float) -> bool:
+    """Compares input values, floats and points within tolerance."""
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(
+            same_value(x, y, tolerance) for x, y in zip(a, b)
+        )
+    if isinstance(a, float) or isinstance(b, float):
+        try:
+            return abs(a - b) <= tolerance
+        except TypeError:
+            return False
+    return a == b
+
+
+class InputCache:
+    """Shadow of the last value set on each input of each tool.
+    Lets a ResolveAPI skip SetInput calls that would not change anything."""
+
+    def __init__(self, tolerance: float = 1e-9) -> None:
+        self.tolerance = tolerance
+        self._inputs: dict[Tool, dict[str, InputValue]] = {}
+
+    def delta(self, tool: Tool, **inputs: InputValue) -> dict[str, InputValue]:
+        """Returns the inputs whose value differs from the last one sent to tool."""
+        sent = self._inputs.get(tool, {})
+        return {
+            name: value
+            for name, value in inputs.items()
+            if name not in sent or not same_value(sent[name], value, self.tolerance)
+        }
+
+    def set_inputs(self, tool: Tool, **inputs: InputValue) -> int:
+        """Sets only changed inputs on tool. Returns how many were set."""
+        changed = self.delta(tool, **inputs)
+        sent = self._inputs.setdefault(tool, {})
+        for name, value in changed.items():
+            tool.SetInput(name, value)
+            sent[name] = value
+        return len(changed)
+
+    def forget(self, *tools: Tool) -> None:
+        """Drops deleted tools, or tools whose inputs were changed elsewhere."""
+        for tool in tools:
+            self._inputs.pop(tool, None)
+
+    def clear(self) -> None:
+        self._inputs.clear()
+
+
+class ToolPool:
+    """Parks the tools of deleted screens instead of deleting them, and hands
+    them out again when screens are added, since creating tools is slow.
+    Parked tools are passed through and moved aside in the flow. When more than
+    max_size tools are parked, the ones parked first are deleted."""
+
+    PARKING_POS = (-32768, -32768)
+
+    def __init__(
+        self,
+        comp: Comp,
+        flow: Flow,
+        max_size: int = 64,
+        cache: InputCache | None = None,
+    ) -> None:
+        self.comp = comp
+        self.flow = flow
+        self.max_size = max_size
+        self.cache = cache
+
+        self._tool_ids: dict[Tool, str] = {}
+        self._parked: deque[Tool] = deque()
+
+    def __len__(self) -> int:
+        return len(self._parked)
+
+    def acquire(self, tool_id: str, x: int, y: int) -> Tool:
+        """Returns a parked tool of type tool_id, or a new one. Reused tools are
+        queued to (x, y), see Flow.FlushSetPosQueue."""
+        tool = self._take(tool_id)
+        if tool is None:
+            tool = self.comp.AddTool(tool_id, x, y)
+            self._tool_ids[tool] = tool_id
+            return tool
+
+        tool.SetAttrs({"TOOLB_PassThrough": False})
+        self.flow.QueueSetPos(tool, x, y)
+        return tool
+
+    def release(self, *tools: Tool) -> None:
+        """Parks tools, deleting the oldest parked ones above max_size."""
+        for tool in tools:
+            if tool not in self._tool_ids:
+                if self.cache is not None:
+                    self.cache.forget(tool)
+                tool.Delete()
+                continue
+
+            tool.SetAttrs({"TOOLB_PassThrough": True})
+            self.flow.QueueSetPos(tool, *self.PARKING_POS)
+            self._parked.append(tool)
+
+        while len(self._parked) > self.max_size:
+            self._delete(self._parked.popleft())
+
+        self.flow.FlushSetPosQueue()
+
+    def flush(self) -> None:
+        """Deletes every parked tool. Call it when the script exits."""
+        while self._parked:
+            self._delete(self._parked.popleft())
+
+    def _take(self, tool_id: str) -> Tool | None:
+        """Takes the most recently parked tool of type tool_id."""
+        for i in range(len(self._parked) - 1, -1, -1):
+            tool = self._parked[i]
+            if self._tool_ids[tool] == tool_id:
+                del self._parked[i]
+                return tool
+        return None
+
+    def _delete(self, tool: Tool) -> None:
+        del self._tool_ids[tool]
+        if self.cache is not None:
+            self.cache.forget(tool)
+        tool.Delete()
 
 
 class ResolveAPI(Protocol):
@@ -7,9 +138,11 @@ class ResolveAPI(Protocol):
         self,
         resolution: tuple[int, int],
         screen_tools: list[tuple[Tool, Tool]],
-        screen_values: list[dict[str, float]] | None = None,
+        screen_values: Sequence[dict[str, float]] | None = None,
     ) -> None:
-        """Calls all necessary methods for when user changes settings to grid, margin or canvas."""
+        """Calls all necessary methods for when user changes settings to grid, margin or canvas.
+        Inputs should be set through an InputCache, so that only values that
+        actually changed since the last refresh are sent to Fusion."""
         raise NotImplementedError()
 
     def add_canvas(self, width: int, height: int) -> None:
@@ -18,7 +151,26 @@ class ResolveAPI(Protocol):
     def add_screen(self) -> tuple[Tool, Tool, Tool]:
         raise NotImplementedError()
 
+    def add_screens(
+        self, values_list: Sequence[dict[str, float]]
+    ) -> list[tuple[Tool, Tool, Tool]]:
+        """Adds the tools of several screens in one pass, in the order given.
+        Node positions go through Flow.QueueSetPos and are flushed once at the end."""
+        raise NotImplementedError()
+
+    def paste_layout(self, setting: str) -> list[tuple[Tool, Tool, Tool]]:
+        """Replaces the canvas and all screen tools with a whole layout, as
+        written by fusion_setting, in a single Comp.Paste call. Returns the tools
+        of every screen, looked up by their screen_tool_names."""
+        raise NotImplementedError()
+
+    def update_screen(self, tools: tuple[Tool, Tool, Tool], **values) -> None:
+        """Sets only the given inputs on the existing tools of a screen."""
+        raise NotImplementedError()
+
     def delete_screen(self) -> None:
+        """Tools of deleted screens should be released to a ToolPool, which
+        add_screen acquires from. Flush the pool when the script exits."""
         raise NotImplementedError()
 
     def delete_all_screens(self) -> None:
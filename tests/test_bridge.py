@@ -0,0 +1,93 @@
+import importlib
+import pathlib
+import sys
+import threading
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+sys.path.insert(0, str(ROOT.parent))
+bridge = importlib.import_module(f"{ROOT.name}.bridge")
+
+VALUES = {"Width": 0.25, "Height": 0.5, "Center": [0.125, 0.75], "Size": 0.5}
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start():
+        server = bridge.BridgeServer(bridge.StandInResolveAPI(), ("127.0.0.1", 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_writer_reader_round_trip():
+    screens = [
+        VALUES,
+        {"Width": 0.25, "Height": 0.5, "Center": [0.375, 0.25], "Size": 0.5},
+        {"Center": [0.1 + 0.2, 1 / 3]},
+        {},
+    ]
+    ints = [0, 1, -1, 63, -64, 64, 2**31, -(2**40)]
+
+    writer = bridge.Writer()
+    writer.ints(ints)
+    writer.text("Screen ⟷ Écran")
+    for values in screens:
+        writer.values(values)
+
+    reader = bridge.Reader(bytes(writer.data))
+    assert reader.ints() == ints
+    assert reader.text() == "Screen ⟷ Écran"
+    for values in screens:
+        decoded = reader.values()
+        assert decoded.keys() == values.keys()
+        for key, value in values.items():
+            assert decoded[key] == pytest.approx(value, abs=1e-9)
+    assert reader.done
+
+
+def test_repeated_values_take_a_byte_each():
+    writer = bridge.Writer()
+    writer.values(VALUES)
+    first = len(writer.data)
+    writer.values(VALUES)
+    # A field mask, then five zero deltas.
+    assert len(writer.data) - first == 6
+
+
+def test_client_calls_reach_the_server(serve):
+    server = serve()
+    client = bridge.BridgeClient(server.server_address)
+
+    with client.batch():
+        first, second = client.add_screens([VALUES, VALUES])
+        client.update_screen(first, Width=0.5)
+    client.delete_screen(second)
+
+    mask, transform, merge = (server.tools[handle] for handle in first)
+    assert mask.GetInput("Width") == pytest.approx(0.5)
+    assert transform.GetInput("Size") == pytest.approx(0.5)
+    assert set(server.tools) == set(first)
+    client.close()
+
+
+def test_reconnecting_to_a_restarted_bridge_raises_state_lost(serve):
+    client = bridge.BridgeClient(serve().server_address)
+    tools = client.add_screen(**VALUES)
+    client.close()
+
+    client.address = serve().server_address
+    with pytest.raises(bridge.BridgeStateLost):
+        client.update_screen(tools, Width=0.5)
+
+    client.add_screen(**VALUES)
+    client.close()
@@ -0,0 +1,36 @@
+import importlib
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+GOLDEN = pathlib.Path(__file__).parent / "golden"
+
+sys.path.insert(0, str(ROOT.parent))
+core = importlib.import_module(f"{ROOT.name}.core")
+fusion_setting = importlib.import_module(f"{ROOT.name}.fusion_setting")
+
+
+def make_grid():
+    canvas = core.Canvas((1920, 1080))
+    margin = core.Margin(canvas, 25, gutter=25)
+    grid = core.Grid(canvas, margin, (12, 6))
+    core.Screen(grid, 2, 2, 1, 1)
+    core.Screen(grid, 3, 2, 4, 3)
+    core.Screen(grid, 12, 1, 1, 6)
+    return grid
+
+
+def test_screens_setting_matches_golden():
+    grid = make_grid()
+    setting = fusion_setting.screens_setting(grid.canvas.resolution, grid.store.values)
+
+    golden = (GOLDEN / "three_screens.setting").read_text(encoding="utf-8")
+    assert setting == golden
+
+
+def test_write_setting(tmp_path):
+    path = tmp_path / "layout.setting"
+    fusion_setting.write_setting(make_grid(), str(path))
+
+    golden = (GOLDEN / "three_screens.setting").read_text(encoding="utf-8")
+    assert path.read_text(encoding="utf-8") == golden
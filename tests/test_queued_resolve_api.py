@@ -0,0 +1,133 @@
+import importlib
+import pathlib
+import sys
+import threading
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+sys.path.insert(0, str(ROOT.parent))
+core = importlib.import_module(f"{ROOT.name}.core")
+controller = importlib.import_module(f"{ROOT.name}.controller")
+queued = importlib.import_module(f"{ROOT.name}.queued_resolve_api")
+
+
+class RecordingAPI:
+    """Records calls. Calls block while gate is cleared, add_screen may fail."""
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail_adds = False
+        self.count = 0
+
+    def refresh_global(self, resolution, screen_tools, screen_values=None):
+        self.gate.wait()
+        self.calls.append(("refresh_global", screen_tools, screen_values))
+
+    def add_screen(self, **values):
+        self.gate.wait()
+        if self.fail_adds:
+            raise RuntimeError("add failed")
+        self.count += 1
+        return tuple(f"{name}{self.count}" for name in ("mask", "transform", "merge"))
+
+    def update_screen(self, tools, **values):
+        self.gate.wait()
+        self.calls.append(("update_screen", tools, values))
+
+    def delete_screen(self, tools):
+        self.calls.append(("delete_screen", tools))
+
+
+class StubGUI:
+    def __init__(self) -> None:
+        self.rects = []
+
+    def draw_screen(self, screen_values):
+        self.rects.append(len(self.rects) + 1)
+        return self.rects[-1]
+
+    def undraw_screens(self, *ids):
+        self.rects = [rect for rect in self.rects if rect not in ids]
+
+    def refresh(self, screen_values):
+        return list(self.rects) or None
+
+
+def make_controller(api):
+    canvas = core.Canvas()
+    grid = core.Grid(canvas, core.Margin(canvas, 25, gutter=25), (12, 6))
+    return controller.Controller(grid, queued.QueuedResolveAPI(api), StubGUI())
+
+
+def test_refresh_global_latest_wins():
+    api = RecordingAPI()
+    queue = queued.QueuedResolveAPI(api)
+
+    api.gate.clear()
+    queue.update_screen(("busy",), Width=0.0)
+    for size in (0.1, 0.2, 0.3):
+        queue.refresh_global((1920, 1080), [], [{"Size": size}])
+    api.gate.set()
+    queue.wait()
+
+    refreshes = [call for call in api.calls if call[0] == "refresh_global"]
+    assert refreshes == [("refresh_global", [], [{"Size": 0.3}])]
+
+
+def test_update_screen_merges_pending_values():
+    api = RecordingAPI()
+    queue = queued.QueuedResolveAPI(api)
+    tools = ("mask", "transform", "merge")
+
+    api.gate.clear()
+    queue.refresh_global((1920, 1080), [])
+    queue.update_screen(tools, Width=0.1)
+    queue.update_screen(tools, Height=0.2, Width=0.3)
+    api.gate.set()
+    queue.wait()
+
+    updates = [call for call in api.calls if call[0] == "update_screen"]
+    assert updates == [("update_screen", tools, {"Width": 0.3, "Height": 0.2})]
+
+
+def test_failed_add_removes_screen_and_keeps_refreshing():
+    api = RecordingAPI()
+    ctl = make_controller(api)
+
+    ctl.add_screen((1, 1))
+    ctl.resolve_api.wait()
+    api.fail_adds = True
+    ctl.add_screen((3, 3))
+    try:
+        ctl.resolve_api.wait()
+    except RuntimeError:
+        pass
+    api.fail_adds = False
+
+    ctl.change_setting("gutter", 10)
+    ctl.resolve_api.wait()
+
+    assert len(ctl.screens) == len(ctl.grid.store) == 1
+    assert ctl.grid.occupancy.screen_at(3, 1) is None
+    assert api.calls[-1][0] == "refresh_global"
+    assert api.calls[-1][1] == [("mask1", "transform1")]
+    assert len(api.calls[-1][2]) == 1
+
+
+def test_failed_add_is_skipped_by_queued_calls():
+    api = RecordingAPI()
+    queue = queued.QueuedResolveAPI(api)
+
+    api.fail_adds = True
+    tools = queue.add_screen(Width=0.1)
+    queue.update_screen(tools, Width=0.2)
+    queue.refresh_global((1920, 1080), [(tools[0], tools[1])], [{"Width": 0.2}])
+    try:
+        queue.wait()
+    except RuntimeError:
+        pass
+
+    assert api.calls == [("refresh_global", [], [])]
+    assert queue.take_failed() == [tools]
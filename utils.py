@@ -13,10 +13,14 @@ def find_first_missing(list: list[int]) -> int:
 
 # Helper function for Screen and Grid classes.
 def get_coords(item, matrix: list[list]) -> tuple[int, int]:
-    for i, v in enumerate(matrix):
-        if item in v:
-            y = i
-            x = v.index(item)
+    if hasattr(matrix, "coords"):
+        return matrix.coords(item)
+
+    # Grid matrices are filled row by row with consecutive indexes starting at 1.
+    cols = len(matrix[0])
+    y, x = divmod(item - 1, cols)
+    if not 0 <= y < len(matrix):
+        raise ValueError(f"{item} is not in matrix")
     return x + 1, y + 1
 
 